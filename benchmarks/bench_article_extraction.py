@@ -0,0 +1,63 @@
+import time
+
+from bs4 import BeautifulSoup
+
+from services.service_publisher import (
+    bp_extractor,
+    cbiz_extractor,
+    einfomax_extractor,
+    hankyung_extractor,
+    investing_extractor,
+    mk_extractor,
+    yf_extractor,
+)
+
+NUM_ROUNDS = 20
+
+# fixture, extractor, and the soup.find the parser used to run on a full BeautifulSoup tree
+fixtures = [
+    ("article_einfomax.html", einfomax_extractor, lambda soup: soup.find("article", id="article-view-content-div")),
+    ("article_hankyung.html", hankyung_extractor, lambda soup: soup.find("div", id="articletxt")),
+    ("article_mk.html", mk_extractor, lambda soup: soup.find("div", attrs={"itemprop": "articleBody"})),
+    ("article_bp.html", bp_extractor, lambda soup: soup.find("div", class_="detail_editor")),
+    ("article_reuter.html", cbiz_extractor, lambda soup: soup.find("script", id="fusion-metadata")),
+    ("article_yf.html", yf_extractor, lambda soup: soup.find("div", class_="caas-body")),
+    ("article_investing.html", investing_extractor, lambda soup: soup.find("div", class_="WYSIWYG")),
+]
+
+
+def extract_with_soup(find, article_html: str):
+    article_soup = find(BeautifulSoup(article_html, "lxml"))
+    return None if article_soup is None else article_soup.text
+
+
+def run(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(NUM_ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / NUM_ROUNDS * 1000
+
+
+def main():
+    print(f"mean of {NUM_ROUNDS} extractions per fixture")
+    total_soup_ms = 0.0
+    total_extractor_ms = 0.0
+    for filename, extractor, find in fixtures:
+        with open(f"tests/services/data/{filename}") as fr:
+            article_html = fr.read()
+        identical = extract_with_soup(find, article_html) == extractor.extract(article_html)
+        soup_ms = run(lambda: extract_with_soup(find, article_html))
+        extractor_ms = run(lambda: extractor.extract(article_html))
+        total_soup_ms += soup_ms
+        total_extractor_ms += extractor_ms
+        print(
+            f"{filename:24s} {len(article_html) // 1024:4d}KB | "
+            f"BeautifulSoup {soup_ms:7.2f}ms | extractor {extractor_ms:6.2f}ms | "
+            f"x{soup_ms / extractor_ms:5.1f} | identical {identical}"
+        )
+    print(f"{'total':31s} | BeautifulSoup {total_soup_ms:7.2f}ms | extractor {total_extractor_ms:6.2f}ms | "
+          f"x{total_soup_ms / total_extractor_ms:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
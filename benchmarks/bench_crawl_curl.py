@@ -0,0 +1,61 @@
+import concurrent.futures
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.service_crawl import crawl_with_curl, crawl_with_curl_headers
+
+NUM_REQUESTS = 200
+
+with open("tests/services/data/article_investing.html", "rb") as fr:
+    article_html = fr.read()
+
+
+class InvestingStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/moved/"):
+            self.send_response(301)
+            self.send_header("Location", self.path.replace("/moved/", "/news/"))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(article_html)))
+        self.end_headers()
+        self.wfile.write(article_html)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(crawl, server_url: str, concurrency: int) -> float:
+    urls = [f"{server_url}/moved/{i}" for i in range(NUM_REQUESTS)]
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(crawl, urls))
+    seconds = time.perf_counter() - start
+    assert all(x.startswith(article_html.decode("utf-8")) for x in results)
+    return NUM_REQUESTS / seconds
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InvestingStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"{NUM_REQUESTS} redirected fetches of a {len(article_html) // 1024}KB page")
+    for concurrency in [1, 4, 16]:
+        curl_throughput = run(crawl_with_curl, server_url, concurrency)
+        in_process_throughput = run(crawl_with_curl_headers, server_url, concurrency)
+        print(
+            f"concurrency={concurrency:2d} | curl subprocess {curl_throughput:6.1f} req/s | "
+            f"in-process pool {in_process_throughput:6.1f} req/s | "
+            f"x{in_process_throughput / curl_throughput:.1f}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import List
+
+from utils.embedding_util import batched_get_embedding, count_tokens
+
+# simulated embeddings endpoint: fixed round trip plus per-token processing time
+ROUND_TRIP_SECONDS = 0.15
+SECONDS_PER_TOKEN = 0.000005
+
+
+class SimulatedEmbeddingApi:
+    def __init__(self):
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text_list: List[str]) -> List[List[float]]:
+        with self.lock:
+            self.requests += 1
+        tokens = sum(count_tokens(text) for text in text_list)
+        time.sleep(ROUND_TRIP_SECONDS + tokens * SECONDS_PER_TOKEN)
+        return [[float(len(text))] for text in text_list]
+
+
+def paginated_get_embedding(text_list: List[str], embedding_api, page_size=5):
+    result = []
+    for i in range(0, len(text_list), page_size):
+        result.extend(embedding_api(text_list[i : i + page_size]))
+    return result
+
+
+def run(num_chunks: int, max_tokens: int, max_workers: int):
+    text_list = [f"chunk {i} " + "금리 인하 interest rate " * 80 for i in range(num_chunks)]
+
+    api = SimulatedEmbeddingApi()
+    start = time.perf_counter()
+    expected = paginated_get_embedding(text_list, api)
+    paginated_seconds = time.perf_counter() - start
+    paginated_requests = api.requests
+
+    api = SimulatedEmbeddingApi()
+    start = time.perf_counter()
+    result = batched_get_embedding(
+        text_list, api, max_tokens=max_tokens, max_workers=max_workers
+    )
+    batched_seconds = time.perf_counter() - start
+    assert result.tolist() == expected
+
+    print(
+        f"chunks={num_chunks:3d} max_tokens={max_tokens:6d} workers={max_workers} | "
+        f"paginated {paginated_seconds:.3f}s ({paginated_requests} requests) | "
+        f"batched {batched_seconds:.3f}s ({api.requests} requests) | "
+        f"speedup x{paginated_seconds / batched_seconds:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    for num_chunks in [5, 20, 60]:
+        run(num_chunks, max_tokens=300000, max_workers=4)
+        run(num_chunks, max_tokens=20000, max_workers=4)
@@ -0,0 +1,49 @@
+import base64
+import json
+import time
+
+import numpy as np
+
+from utils.embedding_util import decode_base64_embeddings
+
+NUM_CHUNKS = 50
+DIMENSIONS = 1024
+REPEAT = 50
+
+
+def main():
+    embeddings = np.random.default_rng(0).standard_normal((NUM_CHUNKS, DIMENSIONS))
+    embeddings = embeddings.astype(np.float32)
+    float_payload = json.dumps(
+        {"data": [{"embedding": x.tolist()} for x in embeddings]}
+    )
+    base64_payload = json.dumps(
+        {"data": [{"embedding": base64.b64encode(x.tobytes()).decode()} for x in embeddings]}
+    )
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        response = json.loads(float_payload)
+        float_result = np.array([x["embedding"] for x in response["data"]])
+    float_seconds = (time.perf_counter() - start) / REPEAT
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        response = json.loads(base64_payload)
+        base64_result = decode_base64_embeddings(
+            [x["embedding"] for x in response["data"]], DIMENSIONS
+        )
+    base64_seconds = (time.perf_counter() - start) / REPEAT
+
+    np.testing.assert_allclose(float_result, base64_result, rtol=1e-6)
+    print(
+        f"{NUM_CHUNKS}x{DIMENSIONS} | "
+        f"json floats {len(float_payload) / 1024:.0f}KB {float_seconds * 1000:.2f}ms "
+        f"({float_result.nbytes / 1024:.0f}KB float64) | "
+        f"base64 {len(base64_payload) / 1024:.0f}KB {base64_seconds * 1000:.2f}ms "
+        f"({base64_result.nbytes / 1024:.0f}KB float32)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+import time
+
+import numpy as np
+
+from utils.embedding_util import (
+    QuantizedEmbeddings,
+    dequantize_embeddings,
+    truncate_embeddings,
+)
+
+CORPUS_SIZE = 20000
+TOP_K = 10
+NUM_CANDIDATES_LIST = [100, 1000]
+
+
+def load_query_embeddings() -> np.ndarray:
+    query_embeddings = []
+    for path in [
+        "tests/services/data/kor_query_embedding.json",
+        "tests/services/data/eng_query_embedding.json",
+    ]:
+        with open(path) as fr:
+            query_embeddings.append(json.loads(fr.read()))
+    return np.asarray(query_embeddings, dtype=np.float32)
+
+
+def build_corpus(query_embeddings: np.ndarray) -> np.ndarray:
+    # documents scattered around the recorded questions with varying relevance
+    rng = np.random.default_rng(0)
+    noise = rng.standard_normal((CORPUS_SIZE, query_embeddings.shape[1]))
+    noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+    weights = rng.uniform(0, 1.2, size=(CORPUS_SIZE, 1))
+    anchors = query_embeddings[rng.integers(0, len(query_embeddings), CORPUS_SIZE)]
+    corpus = (anchors * weights + noise).astype(np.float32)
+    return corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+
+
+def main():
+    query_embeddings = load_query_embeddings()
+    corpus = build_corpus(query_embeddings)
+    exact_top_k = [np.argsort(-corpus.dot(query))[:TOP_K] for query in query_embeddings]
+    kor_embedding, eng_embedding = query_embeddings
+    print("recorded kor/eng question similarity")
+    for storage_mode in ["float32", "float16", "int8"]:
+        for prefix_dimensions in [None, 512, 256]:
+            quantized = QuantizedEmbeddings(
+                kor_embedding[None], storage_mode, prefix_dimensions
+            )
+            if prefix_dimensions:
+                prefix_embeddings = dequantize_embeddings(
+                    quantized.prefix_vectors, quantized.prefix_scales
+                )
+                similarity = prefix_embeddings.dot(
+                    truncate_embeddings(eng_embedding, prefix_dimensions)
+                )[0]
+                exact = truncate_embeddings(kor_embedding, prefix_dimensions).dot(
+                    truncate_embeddings(eng_embedding, prefix_dimensions)
+                )
+            else:
+                similarity = quantized.score(eng_embedding)[0]
+                exact = kor_embedding.dot(eng_embedding)
+            print(
+                f"{storage_mode:8s} prefix={str(prefix_dimensions):4s} | "
+                f"{similarity:.5f} (float32 {exact:.5f})"
+            )
+
+    print(f"corpus {CORPUS_SIZE}x{corpus.shape[1]}, recall@{TOP_K} vs exact float32")
+    for storage_mode in ["float32", "float16", "int8"]:
+        for prefix_dimensions in [None, 512, 256]:
+            quantized = QuantizedEmbeddings(corpus, storage_mode, prefix_dimensions)
+            for num_candidates in NUM_CANDIDATES_LIST:
+                if prefix_dimensions is None and num_candidates != NUM_CANDIDATES_LIST[0]:
+                    continue
+                recalls = []
+                score_errors = []
+                start = time.perf_counter()
+                for query, expected in zip(query_embeddings, exact_top_k):
+                    scores, indices = quantized.search(query, TOP_K, num_candidates)
+                    recalls.append(len(set(indices) & set(expected)) / TOP_K)
+                    score_errors.append(
+                        np.abs(scores - corpus[indices].dot(query)).max()
+                    )
+                seconds = (time.perf_counter() - start) / len(query_embeddings)
+                print(
+                    f"{storage_mode:8s} prefix={str(prefix_dimensions):4s} "
+                    f"candidates={num_candidates:4d} | "
+                    f"{quantized.nbytes / 1024 / 1024:6.1f}MB "
+                    f"({quantized.nbytes / corpus.nbytes:4.0%} of float32) | "
+                    f"recall {np.mean(recalls):.2f} | "
+                    f"max score error {max(score_errors):.5f} | "
+                    f"{seconds * 1000:.1f}ms/query"
+                )
+
+
+if __name__ == "__main__":
+    main()
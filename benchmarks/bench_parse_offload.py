@@ -0,0 +1,77 @@
+import concurrent.futures
+import statistics
+import threading
+import time
+
+from services import service_parse
+
+ARTICLES_PER_QUESTION = 5
+HEARTBEAT_SECONDS = 0.005
+
+fixtures = [
+    ("https://news.einfomax.co.kr/news/articleView.html?idxno=1", "article_einfomax.html"),
+    ("https://www.hankyung.com/article/1", "article_hankyung.html"),
+    ("https://www.mk.co.kr/news/stock/1", "article_mk.html"),
+    ("https://www.businesspost.co.kr/BP?command=article_view&num=1", "article_bp.html"),
+    ("https://finance.yahoo.com/news/1.html", "article_yf.html"),
+    ("https://www.investing.com/news/stock-market-news/1", "article_investing.html"),
+]
+articles = []
+for url, filename in fixtures:
+    with open(f"tests/services/data/{filename}") as fr:
+        articles.append((url, fr.read()))
+
+
+def ask_question(question_idx: int) -> float:
+    # one simulated question: its articles are parsed on threads, like parallel_request_parse_articles
+    start = time.perf_counter()
+    question_articles = [articles[(question_idx + i) % len(articles)] for i in range(ARTICLES_PER_QUESTION)]
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        list(executor.map(lambda x: service_parse.parse_article_content(*x), question_articles))
+    return time.perf_counter() - start
+
+
+def heartbeat(stop: threading.Event, lags: list):
+    # stands in for streamlit's own threads: how late does a 5ms timer wake up
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(HEARTBEAT_SECONDS)
+        lags.append(time.perf_counter() - start - HEARTBEAT_SECONDS)
+
+
+def run(num_questions: int) -> dict:
+    lags = []
+    stop = threading.Event()
+    heartbeat_thread = threading.Thread(target=heartbeat, args=(stop, lags))
+    heartbeat_thread.start()
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_questions) as executor:
+        latencies = sorted(executor.map(ask_question, range(num_questions)))
+    wall_seconds = time.perf_counter() - start
+    stop.set()
+    heartbeat_thread.join()
+    return {
+        "wall": wall_seconds,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "max_lag_ms": max(lags) * 1000,
+    }
+
+
+def main():
+    print(f"{ARTICLES_PER_QUESTION} articles per question, parse workers: {service_parse.parse_workers}")
+    service_parse.parse_mode = "process"
+    service_parse.get_parse_executor()
+    for num_questions in [8, 16, 32]:
+        for parse_mode in ["thread", "process"]:
+            service_parse.parse_mode = parse_mode
+            result = run(num_questions)
+            print(
+                f"questions={num_questions:2d} {parse_mode:7s} | wall {result['wall']:6.2f}s | "
+                f"p50 {result['p50']:6.2f}s | p95 {result['p95']:6.2f}s | "
+                f"heartbeat max lag {result['max_lag_ms']:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import random
+import statistics
+import time
+
+from services import service_crawl
+
+ARTICLES_PER_TARGET = 10
+CHUNKS_PER_ARTICLE = 6
+# one embeddings request: a round trip plus a little per chunk
+EMBEDDING_REQUEST_SECONDS = 0.35
+EMBEDDING_CHUNK_SECONDS = 0.004
+ROUNDS = 5
+
+
+def crawl_article(url: str) -> str:
+    # page latency is encoded in the url so every window sees the same crawl
+    time.sleep(float(url.rsplit("/", 1)[1]))
+    return url
+
+
+def embed(num_chunks: int):
+    time.sleep(EMBEDDING_REQUEST_SECONDS + EMBEDDING_CHUNK_SECONDS * num_chunks)
+
+
+def run(urls: list, collect_seconds: float) -> dict:
+    # one streaming target: embed each batch on the consumer thread, like iter_search_news
+    start = time.perf_counter()
+    result_seconds = []
+    requests = 0
+    for article_html_dict in service_crawl.iter_crawl_articles(urls, 10.0, None, collect_seconds):
+        embed(CHUNKS_PER_ARTICLE * len(article_html_dict))
+        requests += 1
+        result_seconds.extend([time.perf_counter() - start] * len(article_html_dict))
+    return {
+        "requests": requests,
+        "first": result_seconds[0],
+        "median": statistics.median(result_seconds),
+        "last": result_seconds[-1],
+    }
+
+
+def main():
+    service_crawl.crawl_article = crawl_article
+    rng = random.Random(7)
+    # lognormal page latencies, every page on its own host so no host limit kicks in
+    rounds = [
+        [f"https://host{i}.com/{rng.lognormvariate(-0.5, 0.6):.3f}" for i in range(ARTICLES_PER_TARGET)]
+        for _ in range(ROUNDS)
+    ]
+    print(f"{ARTICLES_PER_TARGET} articles per target, {EMBEDDING_REQUEST_SECONDS * 1000:.0f}ms per embedding request")
+    for collect_seconds in [0.0, 0.05, 0.1, 0.25, 0.5]:
+        results = [run(urls, collect_seconds) for urls in rounds]
+        print(
+            f"window {collect_seconds * 1000:4.0f}ms | "
+            f"requests {statistics.mean(x['requests'] for x in results):5.1f} | "
+            f"first {statistics.mean(x['first'] for x in results):5.2f}s | "
+            f"median {statistics.mean(x['median'] for x in results):5.2f}s | "
+            f"last {statistics.mean(x['last'] for x in results):5.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,9 @@ from service_openai import get_embedding
 from service_search import search_news
 from typing import List, Tuple
 from service_html import get_reference_page_html
-from service_google import upload_html
+from service_google import flush_uploads, upload_html_list
 from copy import deepcopy
-import concurrent.futures
+from service_executor import get_executor
 
 
 def parallel_search_news(request_info: Tuple[str, List[float], str]) -> List[dict]:
@@ -34,8 +34,7 @@ def search_related_news(
         if question_range == "해외" or question_range == "전체":
             request_info.append((eng_query, eng_question_embedding, "yf"))
             request_info.append((eng_query, eng_question_embedding, "investing"))
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            search_news_result = executor.map(parallel_search_news, request_info)
+        search_news_result = get_executor("search").map(parallel_search_news, request_info)
         if search_news_result:
             for news_list in search_news_result:
                 related_news.extend(news_list)
@@ -46,15 +45,18 @@ def search_related_news(
 
 
 def upload_related_news(related_news_list: List[dict]) -> List[dict]:
-    updated_news_list = []
-    for related_news in related_news_list:
-        updated_news = deepcopy(related_news)
-        reference_page_html = get_reference_page_html(
+    reference_page_html_list = [
+        get_reference_page_html(
             origin_url=related_news["uploaded_news_url"],
             reference_url=related_news["url"],
             related_paragraph=related_news["related_paragraph"]
         )
-        reference_page_url = upload_html(related_news["uploaded_news_url"], reference_page_html)
+        for related_news in related_news_list
+    ]
+    reference_page_url_list = upload_html_list(reference_page_html_list)
+    updated_news_list = []
+    for related_news, reference_page_url in zip(related_news_list, reference_page_url_list):
+        updated_news = deepcopy(related_news)
         updated_news["reference_page_url"] = reference_page_url
         updated_news_list.append(updated_news)
     return updated_news_list
@@ -76,4 +78,6 @@ def run(request):
     )
     if related_news:
         related_news = upload_related_news(related_news)
+    # the instance may be frozen once the response is sent, so news pages still being written go out first
+    flush_uploads()
     return related_news
@@ -3,12 +3,11 @@ from copy import deepcopy
 from typing import List
 import json
 import os
-from datetime import datetime
-from hashlib import md5
 
 from google.cloud import storage
 from google.oauth2.service_account import Credentials
 from service_html import get_reference_page_html
+from service_upload import UploadManifest, UploadService
 
 encoded_google_secret = os.environ.get("GOOGLE_SECRET", "")
 decoded_google_secret = base64.b64decode(encoded_google_secret).decode("utf-8")
@@ -16,28 +15,33 @@ google_secret_json = json.loads(decoded_google_secret)
 
 credentials = Credentials.from_service_account_info(google_secret_json)
 storage_client = storage.Client(credentials=credentials)
+# blobs are named by content hash and recorded in a local manifest, so a page already in the bucket is never resent
+upload_service = UploadService(
+    storage_client.bucket("reference_page"),
+    UploadManifest(
+        os.environ.get("UPLOAD_MANIFEST_PATH", "/tmp/upload_manifest.sqlite3"),
+        ttl_seconds=float(os.environ.get("UPLOAD_MANIFEST_TTL_SECONDS", 30 * 24 * 3600)),
+    ),
+    "https://storage.googleapis.com/reference_page",
+)
 
 
 def upload_html(url: str, html: str) -> str:
-    bucket = storage_client.bucket("reference_page")
-    datetime_str = datetime.now().strftime("%Y%m%d")
-    hashkey = md5(url.encode()).hexdigest()
-    destination_path = f"{datetime_str}/reference_page/{hashkey}.html"
-    blob = bucket.blob(destination_path)
-    blob.upload_from_string(html, content_type="text/html")
-    reference_page_url = f"https://storage.googleapis.com/reference_page/{destination_path}"
-    return reference_page_url
+    return upload_service.upload("reference_page", html)
+
+
+def upload_html_list(html_list: List[str]) -> List[str]:
+    return upload_service.upload_many("reference_page", html_list)
 
 
 def upload_news_html(url: str, html: str) -> str:
-    bucket = storage_client.bucket("reference_page")
-    datetime_str = datetime.now().strftime("%Y%m%d")
-    hashkey = md5(url.encode()).hexdigest()
-    destination_path = f"{datetime_str}/news/{hashkey}.html"
-    blob = bucket.blob(destination_path)
-    blob.upload_from_string(html, content_type="text/html")
-    reference_page_url = f"https://storage.googleapis.com/reference_page/{destination_path}"
-    return reference_page_url
+    # write-behind: the url is returned at once and the blob is sent while the other targets finish
+    public_url, _ = upload_service.submit("news", html)
+    return public_url
+
+
+def flush_uploads():
+    upload_service.flush()
 
 
 
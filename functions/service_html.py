@@ -1,4 +1,6 @@
+import html
 from typing import Optional
+from urllib.parse import urlparse
 
 
 html_template = """
@@ -54,8 +56,18 @@ html_template = """
     """
 
 
+def is_http_url(url: str) -> bool:
+    return urlparse(url).scheme in ("http", "https")
+
+
 def get_reference_page_html(origin_url: str, reference_url: Optional[str], related_paragraph: str) -> str:
+    # article text and search result urls end up in markup, none of it is trusted
+    for url in [origin_url, reference_url]:
+        if url is not None and not is_http_url(url):
+            raise ValueError(f"Invalid reference page url: {url}")
+    related_paragraph = html.escape(related_paragraph)
     if reference_url is not None:
+        reference_url = html.escape(reference_url)
         text = f"""
             <h1>원문</h1>
             <a href="{reference_url}">{reference_url}</a>
@@ -68,6 +80,6 @@ def get_reference_page_html(origin_url: str, reference_url: Optional[str], relat
             <p>{related_paragraph}</p>
         """
     return html_template.format(
-        origin_url=origin_url,
+        origin_url=html.escape(origin_url),
         text=text,
     )
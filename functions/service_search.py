@@ -1,4 +1,3 @@
-import concurrent.futures
 import os
 import subprocess
 import re
@@ -13,12 +12,20 @@ from dateutil import parser
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pytz import timezone
 
+from service_executor import get_executor
 from service_google import upload_news_html
 from service_openai import get_embedding
+from service_http import DEFAULT_TIMEOUT, Timeout, http_client
 
 google_search_url_template = ("https://www.googleapis.com/customsearch/v1"
                               "?key={API_KEY}&cx={CSE_KEY}&q={QUERY}"
                               "&num=5&sort=date:r:{start}:{end}")
+curl_user_agent = ("Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/121.0.0.0 Mobile Safari/537.36")
+# bot protection answers these to clients it does not trust, curl still gets through
+curl_fallback_status_codes = {403, 429, 503}
+# only investing.com goes through curl here, and its publisher registry entry in the app uses the default budget
+curl_timeout = DEFAULT_TIMEOUT
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=2000,
     chunk_overlap=20,
@@ -53,7 +60,7 @@ def _request_search_api(query: str, target: str) -> dict:
         start=start,
         end=end
     )
-    response = requests.get(url)
+    response = http_client.get(url)
     return response.json()
 
 
@@ -108,8 +115,13 @@ def get_publisher(url: str) -> str:
 def search_news(query: str, query_embedding: List[float], target: str) -> List[dict]:
     news_items = get_news_items(query, target)
     info_list = [(news_item, query_embedding) for news_item in news_items]
-    news_items = parallel_request_parse_articles(info_list)
-    news_items = [x for x in news_items if x["similarity"] > 0.35]
+    parsed_articles = parallel_request_parse_articles(info_list)
+    parsed_articles = [(x, html) for x, html in parsed_articles if x["similarity"] > 0.35]
+    # only articles that can end up as a reference are worth uploading
+    news_items = []
+    for news_item, article_html in parsed_articles:
+        news_item["uploaded_news_url"] = upload_news_html(news_item["url"], article_html)
+        news_items.append(news_item)
     return news_items
 
 
@@ -200,19 +212,57 @@ def parse_related_paragraph(query_embedding: List[float], article: str) -> Tuple
     return sorted(similarity_list, key=lambda x: x[0], reverse=True)[0]
 
 
-def crawl_with_curl(url: str) -> str:
+def get_curl_max_seconds(timeout: Timeout) -> float:
+    # curl has one budget for the whole transfer where requests has connect + read
+    return float(sum(timeout)) if isinstance(timeout, tuple) else float(timeout)
+
+
+def crawl_with_curl(url: str, timeout: Timeout = curl_timeout) -> str:
+    max_seconds = get_curl_max_seconds(timeout)
     curl_cmd = ["curl",
                 "-L",
+                "--max-time", str(max_seconds),
                 "-w", " - status code: %{http_code}, sizes: %{size_request}/%{size_download}",
                 url,
-                "-H", "user-agent: Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Mobile Safari/537.36"]
-    result = subprocess.run(curl_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                "-H", f"user-agent: {curl_user_agent}"]
+    # the subprocess timeout only fires if curl itself hangs past its own --max-time
+    try:
+        result = subprocess.run(curl_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                timeout=max_seconds + 1)
+    except subprocess.TimeoutExpired as e:
+        raise requests.Timeout(f"curl did not exit within {max_seconds + 1}s for {url}") from e
+    if result.returncode == 28:
+        raise requests.Timeout(f"curl timed out after {max_seconds}s for {url}")
     article_html = result.stdout
     return article_html
 
 
+def crawl_with_curl_headers(url: str, timeout: Timeout = curl_timeout) -> str:
+    # same request curl sends: mobile user agent, */* accept, redirects followed
+    response = http_client.get(
+        url=url,
+        headers={
+            "User-Agent": curl_user_agent,
+            "Accept": "*/*",
+        },
+        allow_redirects=True,
+        timeout=timeout,
+    )
+    if response.status_code in curl_fallback_status_codes:
+        raise requests.HTTPError(f"{response.status_code} for {url}", response=response)
+    return response.content.decode("utf-8", errors="replace")
+
+
+def crawl_like_curl(url: str, timeout: Timeout = curl_timeout) -> str:
+    try:
+        return crawl_with_curl_headers(url, timeout)
+    except requests.RequestException as e:
+        print("FALLBACK TO CURL", url, e)
+        return crawl_with_curl(url, timeout)
+
+
 def crawl_with_requests(url: str) -> str:
-    response = requests.get(
+    response = http_client.get(
         url=url,
         headers={
             'User-Agent': 'Mozilla/5.0',
@@ -222,14 +272,13 @@ def crawl_with_requests(url: str) -> str:
     return article_html
 
 
-def request_parse_article(info: Tuple[dict, List[float]]) -> Optional[dict]:
+def request_parse_article(info: Tuple[dict, List[float]]) -> Optional[Tuple[dict, str]]:
     news_item, query_embedding = info
     url = news_item["url"]
     if url.startswith("https://www.investing.com"):
-        article_html = crawl_with_curl(url)
+        article_html = crawl_like_curl(url)
     else:
         article_html = crawl_with_requests(url)
-    uploaded_news_url = upload_news_html(url, article_html)
     article_content = parse_article(url, article_html)
     if not article_content:
         return None
@@ -237,12 +286,10 @@ def request_parse_article(info: Tuple[dict, List[float]]) -> Optional[dict]:
     news_item["index"] = idx
     news_item["similarity"] = similarity
     news_item["related_paragraph"] = related_paragraph
-    news_item["uploaded_news_url"] = uploaded_news_url
-    return news_item
+    return news_item, article_html
 
 
-def parallel_request_parse_articles(info_list: List[Tuple[dict, List[float]]]) -> List[dict]:
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        news_items = executor.map(request_parse_article, info_list)
+def parallel_request_parse_articles(info_list: List[Tuple[dict, List[float]]]) -> List[Tuple[dict, str]]:
+    news_items = get_executor("article").map(request_parse_article, info_list)
     news_items = [x for x in news_items if x]
     return news_items
@@ -0,0 +1,168 @@
+import concurrent.futures
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from hashlib import md5
+from typing import Dict, List, Optional, Tuple
+
+from service_executor import get_executor
+
+
+class LocalBlob:
+    def __init__(self, bucket: "LocalBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.content_type: Optional[str] = None
+        self.content_encoding: Optional[str] = None
+
+    def upload_from_string(self, data: bytes, content_type: str = "text/plain"):
+        path = os.path.join(self.bucket.root, self.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fw:
+            fw.write(data)
+        self.content_type = content_type
+        with self.bucket.lock:
+            self.bucket.metadata[self.name] = {
+                "content_type": content_type,
+                "content_encoding": self.content_encoding,
+            }
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.bucket.root, self.name))
+
+
+class LocalBucket:
+    # the part of google.cloud.storage.Bucket the upload service uses, backed by a directory
+    def __init__(self, root: str):
+        self.root = root
+        self.metadata: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+
+
+class UploadManifest:
+    def __init__(self, path: str, ttl_seconds: float = 30 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+CREATE TABLE IF NOT EXISTS upload (
+    destination_path TEXT PRIMARY KEY,
+    raw_bytes INTEGER NOT NULL,
+    uploaded_bytes INTEGER NOT NULL,
+    uploaded_at REAL NOT NULL
+)
+"""
+        )
+        self.conn.commit()
+
+    def contains(self, destination_path: str) -> bool:
+        # past the ttl the bucket's lifecycle rule may have deleted the blob, so it is sent again
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT uploaded_at FROM upload WHERE destination_path=?", (destination_path,)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def put(self, destination_path: str, raw_bytes: int, uploaded_bytes: int):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO upload VALUES (?, ?, ?, ?)",
+                (destination_path, raw_bytes, uploaded_bytes, time.time()),
+            )
+            self.conn.commit()
+
+
+class UploadService:
+    def __init__(
+        self,
+        bucket,
+        manifest: UploadManifest,
+        public_url_prefix: str,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        self.bucket = bucket
+        self.manifest = manifest
+        self.public_url_prefix = public_url_prefix
+        self.executor = executor or get_executor("upload")
+        self.pending: Dict[str, concurrent.futures.Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {"uploaded": 0, "skipped": 0, "failed": 0, "raw_bytes": 0, "uploaded_bytes": 0}
+
+    def get_destination_path(self, prefix: str, data: bytes) -> str:
+        # named by content, so the same page maps to the same blob on every day and every worker
+        return f"{prefix}/{md5(data).hexdigest()}.html"
+
+    def _upload(self, destination_path: str, data: bytes):
+        compressed = gzip.compress(data, mtime=0)
+        blob = self.bucket.blob(destination_path)
+        blob.content_encoding = "gzip"
+        try:
+            blob.upload_from_string(compressed, content_type="text/html; charset=utf-8")
+        except Exception as e:
+            print("UPLOAD FAILED", destination_path, e)
+            with self.lock:
+                self.stats["failed"] += 1
+            raise
+        self.manifest.put(destination_path, len(data), len(compressed))
+        with self.lock:
+            self.stats["uploaded"] += 1
+            self.stats["raw_bytes"] += len(data)
+            self.stats["uploaded_bytes"] += len(compressed)
+
+    def _remove_pending(self, destination_path: str):
+        with self.lock:
+            self.pending.pop(destination_path, None)
+
+    def submit(self, prefix: str, html: str) -> Tuple[str, concurrent.futures.Future]:
+        # write-behind: the url is known before the blob is sent, the future tells when it is there
+        data = html.encode("utf-8")
+        destination_path = self.get_destination_path(prefix, data)
+        public_url = f"{self.public_url_prefix}/{destination_path}"
+        with self.lock:
+            # a blob already sent, or being sent by another caller, is not sent again
+            future = self.pending.get(destination_path)
+            if future is not None:
+                self.stats["skipped"] += 1
+                return public_url, future
+            if self.manifest.contains(destination_path):
+                self.stats["skipped"] += 1
+                future = concurrent.futures.Future()
+                future.set_result(None)
+                return public_url, future
+            future = self.executor.submit(self._upload, destination_path, data)
+            self.pending[destination_path] = future
+        future.add_done_callback(lambda _: self._remove_pending(destination_path))
+        return public_url, future
+
+    def upload(self, prefix: str, html: str) -> str:
+        public_url, future = self.submit(prefix, html)
+        future.result()
+        return public_url
+
+    def upload_many(self, prefix: str, html_list: List[str]) -> List[str]:
+        submitted = [self.submit(prefix, html) for html in html_list]
+        for _, future in submitted:
+            future.result()
+        return [public_url for public_url, _ in submitted]
+
+    def flush(self, timeout: Optional[float] = None):
+        with self.lock:
+            futures = list(self.pending.values())
+        concurrent.futures.wait(futures, timeout=timeout)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self.pending)
+        return stats
@@ -1,6 +1,7 @@
 import streamlit as st
 
 from services.service_db import select_question_answer
+from utils.html_util import get_saved_news_reference_page_link
 from utils.streamlit_util import (
     draw_news,
     draw_main_ideas,
@@ -27,6 +28,9 @@ st.write(f"**질문: {question}**")
 answer = eval(answer)
 if "question_range" in answer:
     st.write(f"**질문 범위: {answer['question_range']}**")
+for i, news_item in enumerate(answer["related_news"]):
+    # links saved with the answer point at the article store, which does not keep articles for good
+    news_item["reference_page_url"] = get_saved_news_reference_page_link(question_id, i)
 draw_news(answer["related_news"], expanded=False)
 st.write(answer["news_based_answer"])
 main_ideas = [x["main_idea"] for x in answer["report_based_answer"]]
@@ -0,0 +1,93 @@
+import json
+from typing import Optional
+
+import streamlit as st
+
+from services.service_db import select_question_answer
+from services.service_pinecone import fetch_report
+from services.service_search import get_news_reference, get_saved_news_reference, upload_news_page
+from utils.html_util import get_reference_page_html
+
+st.set_page_config(layout="wide")
+st.markdown(
+    """
+<style>
+[data-testid="stAppViewBlockContainer"] {
+    padding: 0rem 5rem 0rem 5rem;
+}
+</style>
+""",
+    unsafe_allow_html=True,
+)
+
+
+@st.cache_data(ttl=3600)
+def load_news_page(url: str) -> str:
+    return upload_news_page(url)
+
+
+@st.cache_data(ttl=3600)
+def load_saved_news_reference(question_id: int, news_index: int) -> Optional[dict]:
+    row = select_question_answer(question_id)
+    if row is None:
+        return None
+    _, _, answer = row
+    return get_saved_news_reference(json.loads(answer).get("related_news", []), news_index)
+
+
+@st.cache_data(ttl=3600)
+def load_report(namespace: str, report_id: str) -> Optional[dict]:
+    return fetch_report(namespace, report_id)
+
+
+# links carry keys only; the url and paragraph are read back from the article store, a saved answer or the index
+news_key = st.query_params.get("news")
+question_id = st.query_params.get("question", "")
+report_id = st.query_params.get("report")
+news_reference = None
+if news_key or question_id:
+    if news_key:
+        chunk_index = st.query_params.get("chunk", "")
+        if chunk_index.isdigit():
+            news_reference = get_news_reference(news_key, int(chunk_index))
+    else:
+        news_index = st.query_params.get("news_index", "")
+        if question_id.isdigit() and news_index.isdigit():
+            news_reference = load_saved_news_reference(int(question_id), int(news_index))
+    if news_reference is None:
+        st.error("원문을 찾을 수 없습니다.")
+        st.stop()
+    # news pages are uploaded the first time one is opened, reports are framed from their public url
+    try:
+        with st.spinner("뉴스 원문 불러오는 중..."):
+            origin_url = load_news_page(news_reference["url"])
+    except Exception as e:
+        print("REFERENCE PAGE FAILED", news_reference["url"], e)
+        st.error("뉴스 원문을 불러오지 못했습니다.")
+        st.stop()
+    reference_url = news_reference["url"]
+    related_paragraph = news_reference["related_paragraph"]
+elif report_id:
+    report = load_report(st.query_params.get("namespace", ""), report_id)
+    if report is None:
+        st.error("리포트를 찾을 수 없습니다.")
+        st.stop()
+    origin_url = report["metadata"]["public_url"]
+    reference_url = None
+    if "content" in report["metadata"]:
+        related_paragraph = report["metadata"]["content"]
+    else:
+        related_paragraph = report["metadata"]["kor_text"]
+else:
+    st.error("원문이 선택되지 않았습니다.")
+    st.stop()
+try:
+    reference_page_html = get_reference_page_html(
+        origin_url=origin_url,
+        reference_url=reference_url,
+        related_paragraph=related_paragraph,
+    )
+except ValueError:
+    st.error("원문 주소가 올바르지 않습니다.")
+    st.stop()
+st.components.v1.html(reference_page_html, height=900, scrolling=True)
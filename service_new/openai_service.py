@@ -1,31 +1,95 @@
+import os
 from typing import List
 
+import numpy as np
 import openai
 
+from utils.embedding_util import (
+    EMBEDDING_MAX_REQUEST_TOKENS,
+    EmbeddingCache,
+    EmbeddingMicroBatcher,
+    batched_get_embedding,
+    decode_base64_embeddings,
+)
+from utils.executor_util import get_executor
+
 
 class OpenaiService:
-    def __init__(self, azure_openai_api_key: str):
+    def __init__(
+        self,
+        azure_openai_api_key: str,
+        embedding_model: str = "superbsearch-prod-embedding",
+        embedding_dimensions: int = 1024,
+        embedding_cache_path: str = os.environ.get(
+            "EMBEDDING_CACHE_PATH", ".cache/embedding_cache.sqlite3"
+        ),
+        embedding_storage_mode: str = os.environ.get(
+            "EMBEDDING_STORAGE_MODE", "float32"
+        ),
+        embedding_batch_window_ms: float = float(
+            os.environ.get("EMBEDDING_BATCH_WINDOW_MS", 5)
+        ),
+        embedding_max_batch_size: int = int(
+            os.environ.get("EMBEDDING_MAX_BATCH_SIZE", 64)
+        ),
+    ):
         self.azure_client = openai.AzureOpenAI(
             api_version="2024-03-01-preview",
             azure_endpoint="https://superbsearch-us-east.openai.azure.com/",
             api_key=azure_openai_api_key,
         )
+        self.embedding_model = embedding_model
+        self.embedding_dimensions = embedding_dimensions
+        self.embedding_cache = EmbeddingCache(
+            embedding_cache_path, storage_mode=embedding_storage_mode
+        )
+        self.embedding_batcher = EmbeddingMicroBatcher(
+            self._request_embedding,
+            window_ms=embedding_batch_window_ms,
+            max_batch_size=embedding_max_batch_size,
+            executor=get_executor("embedding-request"),
+        )
 
-    def get_embedding(self, text_list: List[str]) -> List[List[float]]:
+    def _request_embedding(self, text_list: List[str]) -> np.ndarray:
         response = self.azure_client.embeddings.create(
-            input=text_list, model="superbsearch-prod-embedding", dimensions=1024
+            input=text_list,
+            model=self.embedding_model,
+            dimensions=self.embedding_dimensions,
+            encoding_format="base64",
+        )
+        return decode_base64_embeddings(
+            [x.embedding for x in response.data], self.embedding_dimensions
+        )
+
+    def get_embedding_matrix(self, text_list: List[str]) -> np.ndarray:
+        return self.embedding_cache.get_or_create(
+            self.embedding_model,
+            self.embedding_dimensions,
+            text_list,
+            self.embedding_batcher.embed,
+        )
+
+    def get_embedding(self, text_list: List[str]) -> List[List[float]]:
+        return self.get_embedding_matrix(text_list).tolist()
+
+    def paginated_get_embedding_matrix(
+        self,
+        text_list: List[str],
+        max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+    ) -> np.ndarray:
+        return batched_get_embedding(
+            text_list,
+            self.get_embedding_matrix,
+            max_tokens=max_tokens,
+            executor=get_executor("embedding"),
         )
-        return [x.embedding for x in response.data]
 
     def paginated_get_embedding(
-        self, text_list: List[str], page_size=5
+        self,
+        text_list: List[str],
+        max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
     ) -> List[List[float]]:
-        result = []
-        for i in range(0, len(text_list), page_size):
-            queries = text_list[i : i + page_size]
-            embedding_result = self.get_embedding(queries)
-            result.extend(embedding_result)
-        return result
+        return self.paginated_get_embedding_matrix(text_list, max_tokens).tolist()
 
     def get_streaming_response(self, messages: List[dict], model="gpt-3.5-turbo-0125"):
         response = self.azure_client.chat.completions.create(
@@ -0,0 +1,257 @@
+import asyncio
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from services.service_publisher import FETCH_CURL, get_publisher_config, publisher_registry
+from utils.article_util import HtmlStore
+from utils.executor_util import get_executor
+from utils.http_util import DEFAULT_TIMEOUT, Timeout, http_client
+
+curl_user_agent = ("Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/121.0.0.0 Mobile Safari/537.36")
+# bot protection answers these to clients it does not trust, curl still gets through
+curl_fallback_status_codes = {403, 429, 503}
+curl_stats = {"in_process": 0, "fallback": 0}
+curl_stats_lock = threading.Lock()
+# raw html with its validators, so refreshes are conditional gets answered by 304 when unchanged
+html_store = HtmlStore(
+    os.environ.get("HTML_STORE_PATH", ".cache/html_store.sqlite3"),
+    max_entries=int(os.environ.get("HTML_STORE_MAX_ENTRIES", 2000)),
+)
+revalidation_stats: Dict[str, Dict[str, int]] = {}
+revalidation_stats_lock = threading.Lock()
+crawl_deadline_seconds = 10.0
+for host, publisher_config in publisher_registry.items():
+    http_client.set_host_limit(host, publisher_config["max_concurrency"])
+# blocking fetches run here; a long-lived pool so stragglers never hold up asyncio.run
+crawl_executor = get_executor("io-crawl")
+
+
+def get_curl_max_seconds(timeout: Timeout) -> float:
+    # curl has one budget for the whole transfer where requests has connect + read
+    return float(sum(timeout)) if isinstance(timeout, tuple) else float(timeout)
+
+
+def crawl_with_curl(url: str, timeout: Optional[Timeout] = None) -> str:
+    max_seconds = get_curl_max_seconds(timeout or DEFAULT_TIMEOUT)
+    curl_cmd = ["curl",
+                "-L",
+                "--max-time", str(max_seconds),
+                "-w", " - status code: %{http_code}, sizes: %{size_request}/%{size_download}",
+                url,
+                "-H", f"user-agent: {curl_user_agent}"]
+    # the subprocess timeout only fires if curl itself hangs past its own --max-time
+    try:
+        result = subprocess.run(curl_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                timeout=max_seconds + 1)
+    except subprocess.TimeoutExpired as e:
+        raise requests.Timeout(f"curl did not exit within {max_seconds + 1}s for {url}") from e
+    if result.returncode == 28:
+        raise requests.Timeout(f"curl timed out after {max_seconds}s for {url}")
+    article_html = result.stdout
+    return article_html
+
+
+def crawl_with_curl_headers(url: str, timeout: Optional[Timeout] = None) -> str:
+    # same request curl sends: mobile user agent, */* accept, redirects followed
+    response = http_client.get(
+        url=url,
+        headers={
+            "User-Agent": curl_user_agent,
+            "Accept": "*/*",
+        },
+        allow_redirects=True,
+        timeout=timeout,
+    )
+    if response.status_code in curl_fallback_status_codes:
+        raise requests.HTTPError(f"{response.status_code} for {url}", response=response)
+    return response.content.decode("utf-8", errors="replace")
+
+
+def crawl_like_curl(url: str, timeout: Optional[Timeout] = None) -> str:
+    try:
+        article_html = crawl_with_curl_headers(url, timeout)
+    except requests.RequestException as e:
+        print("FALLBACK TO CURL", url, e)
+        with curl_stats_lock:
+            curl_stats["fallback"] += 1
+        return crawl_with_curl(url, timeout)
+    with curl_stats_lock:
+        curl_stats["in_process"] += 1
+    return article_html
+
+
+def record_revalidation(url: str, conditional: bool, not_modified: bool, body_bytes: int):
+    host = urlparse(url).hostname or ""
+    with revalidation_stats_lock:
+        stats = revalidation_stats.setdefault(
+            host, {"requests": 0, "conditional": 0, "not_modified": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+        )
+        stats["requests"] += 1
+        stats["conditional"] += int(conditional)
+        stats["not_modified"] += int(not_modified)
+        if not_modified:
+            stats["bytes_saved"] += body_bytes
+        else:
+            stats["bytes_downloaded"] += body_bytes
+
+
+def get_crawl_stats() -> dict:
+    with curl_stats_lock:
+        stats = {f"curl_{key}": value for key, value in curl_stats.items()}
+    with revalidation_stats_lock:
+        # summed over hosts, the per-host split stays in revalidation_stats
+        for key in ["requests", "conditional", "not_modified", "bytes_downloaded", "bytes_saved"]:
+            stats[f"revalidation_{key}"] = sum(x[key] for x in revalidation_stats.values())
+    return stats
+
+
+def crawl_with_requests(url: str, timeout: Optional[Timeout] = None) -> str:
+    headers = {
+        'User-Agent': 'Mozilla/5.0',
+    }
+    stored = html_store.get(url)
+    if stored is not None:
+        if stored["etag"]:
+            headers["If-None-Match"] = stored["etag"]
+        if stored["last_modified"]:
+            headers["If-Modified-Since"] = stored["last_modified"]
+    response = http_client.get(
+        url=url,
+        headers=headers,
+        timeout=timeout,
+    )
+    if response.status_code == 304 and stored is not None:
+        record_revalidation(url, True, True, stored["body_bytes"])
+        return stored["html"]
+    article_html = response.text
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.ok and (etag or last_modified):
+        html_store.put(url, etag, last_modified, article_html, len(response.content))
+    record_revalidation(url, stored is not None, False, len(response.content))
+    return article_html
+
+
+def crawl_article(url: str) -> str:
+    publisher_config = get_publisher_config(url)
+    if publisher_config is None:
+        return crawl_with_requests(url)
+    if publisher_config["fetch"] == FETCH_CURL:
+        return crawl_like_curl(url, publisher_config["timeout"])
+    return crawl_with_requests(url, publisher_config["timeout"])
+
+
+async def crawl_articles_async(urls: List[str],
+                               deadline: float = crawl_deadline_seconds,
+                               cancel_event: Optional[threading.Event] = None,
+                               on_crawled: Optional[Callable[[str, str], None]] = None
+                               ) -> Tuple[Dict[str, str], Dict[str, dict]]:
+    loop = asyncio.get_running_loop()
+    host_semaphores: Dict[str, asyncio.Semaphore] = {}
+    timings = {url: {"status": "pending", "queued_seconds": 0.0, "fetch_seconds": 0.0} for url in urls}
+
+    async def crawl(url: str) -> str:
+        host = urlparse(url).hostname or ""
+        if host not in host_semaphores:
+            host_semaphores[host] = asyncio.Semaphore(http_client.host_limits.get(host, http_client.max_per_host))
+        start = time.perf_counter()
+        async with host_semaphores[host]:
+            fetch_start = time.perf_counter()
+            timings[url]["queued_seconds"] = fetch_start - start
+            timings[url]["status"] = "fetching"
+            article_html = await loop.run_in_executor(crawl_executor, crawl_article, url)
+            timings[url]["fetch_seconds"] = time.perf_counter() - fetch_start
+        return article_html
+
+    tasks = {asyncio.ensure_future(crawl(url)): url for url in dict.fromkeys(urls)}
+    if not tasks:
+        return {}, timings
+    stop_at = time.monotonic() + deadline
+    pending = set(tasks)
+    article_html_dict = {}
+    while pending:
+        remaining = stop_at - time.monotonic()
+        if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+            break
+        # short waits, so a cancel is noticed while a page is still hanging
+        timeout = min(remaining, 0.1) if cancel_event is not None else remaining
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            url = tasks[task]
+            if task.exception() is not None:
+                timings[url]["status"] = "error"
+                timings[url]["error"] = repr(task.exception())
+                continue
+            timings[url]["status"] = "ok"
+            article_html_dict[url] = task.result()
+            if on_crawled is not None:
+                on_crawled(url, task.result())
+    for task in pending:
+        task.cancel()
+        timings[tasks[task]]["status"] = "cancelled"
+    if pending:
+        await asyncio.wait(pending)
+    return article_html_dict, timings
+
+
+def crawl_articles(urls: List[str], deadline: float = crawl_deadline_seconds,
+                   cancel_event: Optional[threading.Event] = None,
+                   on_crawled: Optional[Callable[[str, str], None]] = None) -> Tuple[Dict[str, str], Dict[str, dict]]:
+    article_html_dict, timings = asyncio.run(crawl_articles_async(urls, deadline, cancel_event, on_crawled))
+    failed = {url: x["status"] for url, x in timings.items() if x["status"] != "ok"}
+    if failed:
+        print("CRAWL INCOMPLETE", f"{len(article_html_dict)}/{len(timings)}", failed)
+    return article_html_dict, timings
+
+
+def iter_crawl_articles(urls: List[str], deadline: float = crawl_deadline_seconds,
+                        cancel_event: Optional[threading.Event] = None,
+                        collect_seconds: float = 0.0) -> Iterator[Dict[str, str]]:
+    # yields {url: html} batches as pages land, the deadline and the cancel are crawl_articles_async's own.
+    # a batch holds the first page plus whatever else lands within collect_seconds of it
+    html_queue = queue.Queue()
+    # set on cancel or when the consumer stops early, without touching the caller's event
+    stop_event = threading.Event()
+    future = get_executor("article").submit(
+        crawl_articles, urls, deadline, stop_event, lambda url, article_html: html_queue.put((url, article_html))
+    )
+    future.add_done_callback(lambda _: html_queue.put(None))
+    batch = {}
+    collect_until = None
+    finished = False
+    try:
+        while not finished:
+            if cancel_event is not None and cancel_event.is_set():
+                stop_event.set()
+            wait_seconds = 0.1 if collect_until is None else min(0.1, collect_until - time.monotonic())
+            try:
+                crawled = html_queue.get(timeout=max(wait_seconds, 0.0))
+            except queue.Empty:
+                crawled = ()
+            # pages that piled up while the consumer was busy join the batch without any wait
+            while crawled:
+                url, article_html = crawled
+                batch[url] = article_html
+                if collect_until is None:
+                    collect_until = time.monotonic() + collect_seconds
+                try:
+                    crawled = html_queue.get_nowait()
+                except queue.Empty:
+                    crawled = ()
+            if crawled is None:
+                finished = True
+            if batch and (finished or time.monotonic() >= collect_until):
+                yield batch
+                batch = {}
+                collect_until = None
+    finally:
+        stop_event.set()
+    future.result()
@@ -1,7 +1,6 @@
 import base64
 import json
-from datetime import datetime
-from hashlib import md5
+import os
 from typing import List
 
 import streamlit as st
@@ -9,6 +8,8 @@ from google.cloud import storage
 from google.cloud import translate
 from google.oauth2.service_account import Credentials
 
+from utils.upload_util import UploadManifest, UploadService
+
 encoded_google_secret = st.secrets["GOOGLE_TRANSLATE_SECRET"]
 decoded_google_secret = base64.b64decode(encoded_google_secret).decode("utf-8")
 google_secret_json = json.loads(decoded_google_secret)
@@ -16,6 +17,15 @@ google_secret_json = json.loads(decoded_google_secret)
 credentials = Credentials.from_service_account_info(google_secret_json)
 google_translate_client = translate.TranslationServiceClient(credentials=credentials)
 storage_client = storage.Client(credentials=credentials)
+# blobs are named by content hash and recorded in a local manifest, so a page already in the bucket is never resent
+upload_service = UploadService(
+    storage_client.bucket("reference_page"),
+    UploadManifest(
+        os.environ.get("UPLOAD_MANIFEST_PATH", ".cache/upload_manifest.sqlite3"),
+        ttl_seconds=float(os.environ.get("UPLOAD_MANIFEST_TTL_SECONDS", 30 * 24 * 3600)),
+    ),
+    "https://storage.googleapis.com/reference_page",
+)
 
 
 def translate(queries: List[str], kor_to_eng: bool = True) -> List[str]:
@@ -50,22 +60,8 @@ def paginated_translate(chunks: List[str], metadata:dict, pagesize: int = 5) ->
 
 
 def upload_html(url: str, html: str) -> str:
-    bucket = storage_client.bucket("reference_page")
-    datetime_str = datetime.now().strftime("%Y%m%d")
-    hashkey = md5(url.encode()).hexdigest()
-    destination_path = f"{datetime_str}/reference_page/{hashkey}.html"
-    blob = bucket.blob(destination_path)
-    blob.upload_from_string(html, content_type="text/html")
-    reference_page_url = f"https://storage.googleapis.com/reference_page/{destination_path}"
-    return reference_page_url
+    return upload_service.upload("reference_page", html)
 
 
 def upload_news_html(url: str, html: str) -> str:
-    bucket = storage_client.bucket("reference_page")
-    datetime_str = datetime.now().strftime("%Y%m%d")
-    hashkey = md5(url.encode()).hexdigest()
-    destination_path = f"{datetime_str}/news/{hashkey}.html"
-    blob = bucket.blob(destination_path)
-    blob.upload_from_string(html, content_type="text/html")
-    reference_page_url = f"https://storage.googleapis.com/reference_page/{destination_path}"
-    return reference_page_url
+    return upload_service.upload("news", html)
@@ -1,34 +1,84 @@
 import json
+import os
 from datetime import datetime
 from typing import List, Union
 from typing import Optional
 
+import numpy as np
 import openai
 import streamlit as st
 
+from utils.embedding_util import (
+    EMBEDDING_MAX_REQUEST_TOKENS,
+    EmbeddingCache,
+    EmbeddingMicroBatcher,
+    batched_get_embedding,
+    decode_base64_embeddings,
+)
+from utils.executor_util import get_executor
 from utils.intent import (
     EnumPrimaryIntent,
     EnumMarketStrategyIntent,
     EnumIndustryStockIntent,
 )
 
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMENSIONS = 1024
+
 client = openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+embedding_cache = EmbeddingCache(
+    os.environ.get("EMBEDDING_CACHE_PATH", ".cache/embedding_cache.sqlite3"),
+    storage_mode=os.environ.get("EMBEDDING_STORAGE_MODE", "float32"),
+)
 
 
-def get_embedding(text_list: List[str]) -> List[List[float]]:
+def _request_embedding(text_list: List[str]) -> np.ndarray:
     response = client.embeddings.create(
-        input=text_list, model="text-embedding-3-large", dimensions=1024
+        input=text_list,
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
+        encoding_format="base64",
+    )
+    return decode_base64_embeddings(
+        [x.embedding for x in response.data], EMBEDDING_DIMENSIONS
+    )
+
+
+embedding_batcher = EmbeddingMicroBatcher(
+    _request_embedding,
+    window_ms=float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", 5)),
+    max_batch_size=int(os.environ.get("EMBEDDING_MAX_BATCH_SIZE", 64)),
+    executor=get_executor("embedding-request"),
+)
+
+
+def get_embedding_matrix(text_list: List[str]) -> np.ndarray:
+    return embedding_cache.get_or_create(
+        EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, text_list, embedding_batcher.embed
+    )
+
+
+def get_embedding(text_list: List[str]) -> List[List[float]]:
+    return get_embedding_matrix(text_list).tolist()
+
+
+def paginated_get_embedding_matrix(
+    text_list: List[str],
+    max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+) -> np.ndarray:
+    return batched_get_embedding(
+        text_list,
+        get_embedding_matrix,
+        max_tokens=max_tokens,
+        executor=get_executor("embedding"),
     )
-    return [x.embedding for x in response.data]
 
 
-def paginated_get_embedding(text_list: List[str], page_size=5) -> List[List[float]]:
-    result = []
-    for i in range(0, len(text_list), page_size):
-        queries = text_list[i : i + page_size]
-        embedding_result = get_embedding(queries)
-        result.extend(embedding_result)
-    return result
+def paginated_get_embedding(
+    text_list: List[str],
+    max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+) -> List[List[float]]:
+    return paginated_get_embedding_matrix(text_list, max_tokens).tolist()
 
 
 def get_streaming_response(messages: List[dict], model="gpt-3.5-turbo-0125"):
@@ -0,0 +1,78 @@
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from services.service_publisher import parse_article
+from utils.article_util import get_chunk_offsets
+
+# "process" runs parsing and splitting in a worker pool so they stop holding the GIL of the app process
+parse_mode = os.environ.get("ARTICLE_PARSE_MODE", "thread")
+parse_workers = int(os.environ.get("ARTICLE_PARSE_WORKERS", os.cpu_count() or 2))
+parse_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+parse_executor_lock = threading.Lock()
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=2000,
+    chunk_overlap=20,
+    length_function=len,
+    is_separator_regex=False,
+    keep_separator=True,
+)
+
+# article text plus chunk offsets into it, or the chunks themselves when they cannot be located
+ParsedArticle = Tuple[str, Optional[List[Tuple[int, int]]], Optional[List[str]]]
+
+
+def parse_and_split(url: str, article_html: str) -> Optional[ParsedArticle]:
+    article_content = parse_article(url, article_html)
+    if not article_content:
+        return None
+    article_chunks = text_splitter.split_text(article_content)
+    chunk_offsets = get_chunk_offsets(article_content, article_chunks)
+    if chunk_offsets is None:
+        return article_content, None, article_chunks
+    # offsets instead of chunk strings keep the payload coming back from a worker at about the text size
+    return article_content, chunk_offsets, None
+
+
+def unpack_parsed_article(parsed: ParsedArticle) -> Tuple[str, List[str]]:
+    article_content, chunk_offsets, article_chunks = parsed
+    if article_chunks is None:
+        article_chunks = [article_content[start:end] for start, end in chunk_offsets]
+    return article_content, article_chunks
+
+
+def _warm_up(_: int) -> int:
+    return os.getpid()
+
+
+def get_parse_executor() -> concurrent.futures.ProcessPoolExecutor:
+    global parse_executor
+    with parse_executor_lock:
+        if parse_executor is None:
+            # spawn, not fork: the app process has live threads and sockets
+            parse_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # start every worker and import the parsers now, not on the first question
+            list(parse_executor.map(_warm_up, range(parse_workers)))
+        return parse_executor
+
+
+def parse_article_content(url: str, article_html: str) -> Optional[Tuple[str, List[str]]]:
+    if parse_mode == "process":
+        parsed = get_parse_executor().submit(parse_and_split, url, article_html).result()
+    else:
+        parsed = parse_and_split(url, article_html)
+    if parsed is None:
+        return None
+    return unpack_parsed_article(parsed)
+
+
+if parse_mode == "process" and multiprocessing.parent_process() is None:
+    # warm the pool in the background when the app starts; worker processes import this module too
+    threading.Thread(target=get_parse_executor, daemon=True).start()
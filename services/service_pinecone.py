@@ -1,10 +1,17 @@
+import concurrent.futures
 import os
-from typing import List, Optional
+import time
+from typing import Dict, List, Optional, Tuple
 
 from pinecone import Pinecone
 
+from utils.executor_util import get_executor
+
 pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
+# one client for every thread, its connection pool is shared by all concurrent queries
 index = pc.Index("market-octopus-v2")
+# namespaces a reference page may read a report back from
+report_namespaces = ("fnguide", "investment_bank_v2", "seeking-alpha-analysis-content")
 
 
 def filter_duplicates(matches: List[dict]) -> List[dict]:
@@ -18,41 +25,72 @@ def filter_duplicates(matches: List[dict]) -> List[dict]:
     return filtered_matches[:3]
 
 
-def search_seeking_alpha_summary(
-    query_embedding: List[float], top_k: int = 5
-) -> List[dict]:
+def query_namespace(
+    query_embedding: List[float],
+    namespace: str,
+    top_k: int,
+    filter: Optional[dict] = None,
+) -> Tuple[List[dict], float]:
+    start = time.perf_counter()
     result = index.query(
         vector=query_embedding,
         top_k=top_k,
-        namespace="seeking-alpha-analysis-summary",
+        namespace=namespace,
         include_metadata=True,
+        filter=filter,
     )
     matches = result["matches"]
+    for match in matches:
+        # the reference page fetches a report back by (namespace, id)
+        match["metadata"]["namespace"] = namespace
+    return matches, time.perf_counter() - start
+
+
+def fetch_report(namespace: str, report_id: str) -> Optional[dict]:
+    if namespace not in report_namespaces:
+        return None
+    vector = index.fetch(ids=[report_id], namespace=namespace)["vectors"].get(report_id)
+    if vector is None:
+        return None
+    return {"id": report_id, "metadata": dict(vector["metadata"])}
+
+
+def multi_query(
+    query_embedding: List[float],
+    queries: List[Tuple[str, int, Optional[dict]]],
+) -> dict:
+    # every (namespace, top_k, filter) runs at once, the slowest namespace sets the wait
+    executor = get_executor("vector-query")
+    futures = [
+        executor.submit(query_namespace, query_embedding, namespace, top_k, filter)
+        for namespace, top_k, filter in queries
+    ]
+    namespace_matches = {}
+    latency = {}
+    for (namespace, _, _), future in zip(queries, futures):
+        namespace_matches[namespace], latency[namespace] = future.result()
+    merged_matches = {}
+    for matches in namespace_matches.values():
+        for match in matches:
+            if match["id"] not in merged_matches or merged_matches[match["id"]]["score"] < match["score"]:
+                merged_matches[match["id"]] = match
+    print("PINECONE MULTI QUERY", {k: f"{v * 1000:.0f}ms" for k, v in latency.items()})
+    return {
+        "matches": sorted(merged_matches.values(), key=lambda x: x["score"], reverse=True),
+        "namespaces": namespace_matches,
+        "latency": latency,
+    }
+
+
+def filter_seeking_alpha_summary(matches: List[dict]) -> List[dict]:
     return [x for x in matches if x["score"] if x["score"] > 0.5]
 
 
-def search_investment_bank(query_embedding: List[float], top_k: int = 5) -> List[dict]:
-    result = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        namespace="investment_bank_v2",
-        include_metadata=True,
-    )
-    matches = result["matches"]
+def filter_investment_bank(matches: List[dict]) -> List[dict]:
     return [x for x in matches if x["score"] if x["score"]]
 
 
-def search_seeking_alpha_content(
-    query_embedding: List[float], id_list: List[str], top_k: int = 3
-) -> Optional[List[dict]]:
-    result = index.query(
-        vector=query_embedding,
-        top_k=10,
-        namespace="seeking-alpha-analysis-content",
-        include_metadata=True,
-        filter={"id": {"$in": id_list}},
-    )
-    matches = result["matches"]
+def filter_by_metadata(matches: List[dict], key: str) -> Optional[List[dict]]:
     if not matches:
         return None
 
@@ -60,50 +98,76 @@ def search_seeking_alpha_content(
     visited = set()
     filtered_result = []
     for match in matches:
-        if match["metadata"]["id"] in visited:
+        if match["metadata"][key] in visited:
             continue
         filtered_result.append(match)
-        visited.add(match["metadata"]["id"])
+        visited.add(match["metadata"][key])
     return [x for x in filtered_result if x["score"] > 0.5]
 
 
-def search_fnguide(
-    query_embedding: List[float], top_k: int = 3
+def search_seeking_alpha_summary(
+    query_embedding: List[float], top_k: int = 5
+) -> List[dict]:
+    matches, _ = query_namespace(query_embedding, "seeking-alpha-analysis-summary", top_k)
+    return filter_seeking_alpha_summary(matches)
+
+
+def search_investment_bank(query_embedding: List[float], top_k: int = 5) -> List[dict]:
+    matches, _ = query_namespace(query_embedding, "investment_bank_v2", top_k)
+    return filter_investment_bank(matches)
+
+
+def search_seeking_alpha_content(
+    query_embedding: List[float], id_list: List[str], top_k: int = 3
 ) -> Optional[List[dict]]:
-    result = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        namespace="fnguide",
-        include_metadata=True,
+    matches, _ = query_namespace(
+        query_embedding, "seeking-alpha-analysis-content", 10, {"id": {"$in": id_list}}
     )
-    matches = result["matches"]
-    if not matches:
-        return None
+    return filter_by_metadata(matches, "id")
 
-    # filter duplicates
-    visited = set()
-    filtered_result = []
-    for match in matches:
-        if match["metadata"]["hashkey"] in visited:
-            continue
-        filtered_result.append(match)
-        visited.add(match["metadata"]["hashkey"])
-    return [x for x in filtered_result if x["score"] > 0.5]
+
+def search_fnguide(
+    query_embedding: List[float], top_k: int = 3
+) -> Optional[List[dict]]:
+    matches, _ = query_namespace(query_embedding, "fnguide", top_k)
+    return filter_by_metadata(matches, "hashkey")
+
+
+def search_seeking_alpha(query_embedding: List[float]) -> List[dict]:
+    # content lookup is filtered by the summary hits, so these two stay in order
+    seeking_alpha_summary_list = search_seeking_alpha_summary(query_embedding, top_k=5)
+    if not seeking_alpha_summary_list:
+        return []
+    oversea_report_ids = [x["metadata"]["id"] for x in seeking_alpha_summary_list]
+    return search_seeking_alpha_content(query_embedding, oversea_report_ids, top_k=3) or []
+
+
+def search_reports(
+    query_embedding: List[float], domestic: bool = True, oversea: bool = True
+) -> List[Tuple[str, Optional[List[dict]]]]:
+    # the seeking alpha chain runs beside the independent namespaces instead of ahead of them
+    seeking_alpha_future: Optional[concurrent.futures.Future] = None
+    if oversea:
+        seeking_alpha_future = get_executor("vector-query").submit(search_seeking_alpha, query_embedding)
+    queries = []
+    if domestic:
+        queries.append(("fnguide", 3, None))
+    if oversea:
+        queries.append(("investment_bank_v2", 3, None))
+    namespace_matches: Dict[str, List[dict]] = multi_query(query_embedding, queries)["namespaces"]
+    report_results = []
+    if domestic:
+        report_results.append(("domestic", filter_by_metadata(namespace_matches["fnguide"], "hashkey")))
+    if oversea:
+        report_results.append(("oversea", seeking_alpha_future.result()))
+        report_results.append(("oversea", filter_investment_bank(namespace_matches["investment_bank_v2"])))
+    return report_results
 
 
 def search_related_reports(question_embedding: List[float]) -> List[dict]:
     oversea_report_list = []
-    seeking_alpha_summary_list = search_seeking_alpha_summary(
-        question_embedding, top_k=5
-    )
-    if seeking_alpha_summary_list:
-        oversea_report_ids = [x["metadata"]["id"] for x in seeking_alpha_summary_list]
-        seeking_alpha_content_list = search_seeking_alpha_content(
-            question_embedding, oversea_report_ids, top_k=3
-        )
-        oversea_report_list.extend(seeking_alpha_content_list)
-    investment_bank_list = search_investment_bank(question_embedding, top_k=3)
-    oversea_report_list.extend(investment_bank_list)
+    for _, report_list in search_reports(question_embedding, domestic=False):
+        oversea_report_list.extend(report_list or [])
     oversea_report_list = sorted(
         oversea_report_list, key=lambda x: x["score"], reverse=True
     )[:3]
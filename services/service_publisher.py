@@ -0,0 +1,141 @@
+import re
+from functools import partial
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from utils.extract_util import ArticleExtractor
+from utils.http_util import DEFAULT_TIMEOUT
+
+FETCH_REQUESTS = "requests"
+# bot protected sites get curl's exact request shape, with the curl binary as the fallback
+FETCH_CURL = "curl"
+
+# each publisher's article node, matched while parsing instead of after building a whole soup
+einfomax_extractor = ArticleExtractor("article", "id", "article-view-content-div")
+hankyung_extractor = ArticleExtractor("div", "id", "articletxt")
+mk_extractor = ArticleExtractor("div", "itemprop", "articleBody")
+bp_extractor = ArticleExtractor("div", "class", "detail_editor")
+cbiz_extractor = ArticleExtractor("script", "id", "fusion-metadata")
+yf_extractor = ArticleExtractor("div", "class", "caas-body")
+investing_extractor = ArticleExtractor("div", "class", "WYSIWYG")
+
+# hostname -> everything the crawler and the parsers need to know about a publisher
+publisher_registry: Dict[str, dict] = {
+    "news.einfomax.co.kr": {
+        "name": "연합 인포맥스",
+        "fetch": FETCH_REQUESTS,
+        "extractor": einfomax_extractor,
+        "timeout": DEFAULT_TIMEOUT,
+        "max_concurrency": 4,
+    },
+    "www.hankyung.com": {
+        "name": "한국경제",
+        "fetch": FETCH_REQUESTS,
+        "extractor": hankyung_extractor,
+        "timeout": DEFAULT_TIMEOUT,
+        "max_concurrency": 4,
+    },
+    "www.mk.co.kr": {
+        "name": "매일경제",
+        "fetch": FETCH_REQUESTS,
+        "extractor": mk_extractor,
+        "timeout": DEFAULT_TIMEOUT,
+        "max_concurrency": 4,
+    },
+    "www.businesspost.co.kr": {
+        "name": "비즈니스 포스트",
+        "fetch": FETCH_REQUESTS,
+        "extractor": bp_extractor,
+        "timeout": DEFAULT_TIMEOUT,
+        "max_concurrency": 4,
+    },
+    "finance.yahoo.com": {
+        "name": "yahoo finance",
+        "fetch": FETCH_REQUESTS,
+        "extractor": yf_extractor,
+        # article pages run past 600KB
+        "timeout": (3.05, 15),
+        "max_concurrency": 4,
+    },
+    "www.investing.com": {
+        "name": "investing.com",
+        "fetch": FETCH_CURL,
+        "extractor": investing_extractor,
+        "timeout": DEFAULT_TIMEOUT,
+        "max_concurrency": 2,
+    },
+    "www.bloomberg.com": {
+        "name": "bloomberg",
+        "fetch": FETCH_REQUESTS,
+        "extractor": None,
+        "timeout": DEFAULT_TIMEOUT,
+        "max_concurrency": 2,
+    },
+}
+
+
+def get_publisher_config(url: str) -> Optional[dict]:
+    return publisher_registry.get(urlparse(url).hostname or "")
+
+
+def get_publisher(url: str) -> str:
+    publisher_config = get_publisher_config(url)
+    if publisher_config is None:
+        return ""
+    return publisher_config["name"]
+
+
+def remove_urls(text):
+    url_pattern = r'https?://\S+|www\.\S+'
+    clean_text = re.sub(url_pattern, '', text)
+    return clean_text
+
+
+def extract_article(extractor: ArticleExtractor, article_html: str) -> str:
+    article_content = extractor.extract(article_html)
+    if article_content is None:
+        return ""
+    article_content = remove_urls(article_content)
+    return article_content.strip()
+
+
+def parse_article_einfomax(article_html: str) -> str:
+    return extract_article(einfomax_extractor, article_html)
+
+
+def parse_article_hankyung(article_html: str) -> str:
+    return extract_article(hankyung_extractor, article_html)
+
+
+def parse_article_mk(article_html: str) -> str:
+    return extract_article(mk_extractor, article_html)
+
+
+def parse_article_bp(article_html: str) -> str:
+    return extract_article(bp_extractor, article_html)
+
+
+def parse_article_cbiz(article_html: str) -> str:
+    return extract_article(cbiz_extractor, article_html)
+
+
+def parse_article_yf(article_html: str) -> str:
+    return extract_article(yf_extractor, article_html)
+
+
+def parse_article_investing(article_html: str) -> str:
+    return extract_article(investing_extractor, article_html)
+
+
+def get_article_parser(url: str) -> Optional[Callable[[str], str]]:
+    publisher_config = get_publisher_config(url)
+    if publisher_config is None or publisher_config["extractor"] is None:
+        return None
+    return partial(extract_article, publisher_config["extractor"])
+
+
+def parse_article(url: str, article_html: str) -> str:
+    article_parser = get_article_parser(url)
+    if article_parser is None:
+        return ""
+    return article_parser(article_html)
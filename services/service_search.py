@@ -1,37 +1,83 @@
-import concurrent.futures
-import subprocess
-import re
+import os
+import queue
+import threading
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional, Union
 from urllib.parse import quote
 
 import numpy as np
-import requests
 import streamlit as st
-from bs4 import BeautifulSoup
 from dateutil import parser
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pytz import timezone
 
+from services.service_crawl import (
+    crawl_article,
+    crawl_articles,
+    crawl_deadline_seconds,
+    get_crawl_stats,
+    html_store,
+    iter_crawl_articles,
+)
 from services.service_google import upload_news_html
-from services.service_openai import get_embedding
+from services.service_parse import parse_article_content, text_splitter
+from services.service_openai import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    get_embedding_matrix,
+    paginated_get_embedding_matrix,
+)
+from services.service_publisher import (
+    get_article_parser,
+    get_publisher,
+    get_publisher_config,
+    parse_article,
+    parse_article_bp,
+    parse_article_cbiz,
+    parse_article_einfomax,
+    parse_article_hankyung,
+    parse_article_investing,
+    parse_article_mk,
+    parse_article_yf,
+)
+from utils.article_util import ArticleStore, SimHashIndex
+from utils.cache_util import TTLCache, normalize_query
+from utils.embedding_util import QuantizedEmbeddings, top_k_similarity
+from utils.executor_util import get_executor
+from utils.http_util import http_client
+
+# one question embedding, or the korean and english ones scored together in one pass
+QueryEmbeddings = Union[List[float], List[List[float]]]
 
 google_search_url_template = ("https://www.googleapis.com/customsearch/v1"
                               "?key={API_KEY}&cx={CSE_KEY}&q={QUERY}"
                               "&num=5&sort=date:r:{start}:{end}")
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=2000,
-    chunk_overlap=20,
-    length_function=len,
-    is_separator_regex=False,
-    keep_separator=True,
+# same question, same target and same date window within the ttl answers from memory
+search_api_cache = TTLCache(
+    ttl_seconds=float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 3600)),
+    max_entries=int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 1024)),
 )
-
-
-def remove_urls(text):
-    url_pattern = r'https?://\S+|www\.\S+'
-    clean_text = re.sub(url_pattern, '', text)
-    return clean_text
+# parsed text, chunk boundaries and chunk embeddings of every scored article, by url
+article_store = ArticleStore(
+    os.environ.get("ARTICLE_STORE_PATH", ".cache/article_store.sqlite3"),
+    ttl_seconds=float(os.environ.get("ARTICLE_STORE_TTL_SECONDS", 7 * 24 * 3600)),
+    max_entries=int(os.environ.get("ARTICLE_STORE_MAX_ENTRIES", 5000)),
+    storage_mode=os.environ.get("EMBEDDING_STORAGE_MODE", "float32"),
+)
+# a truncated prefix (e.g. 256) picks candidate chunks before the full-dimension rescoring
+article_prefix_dimensions = int(os.environ.get("ARTICLE_PREFIX_DIMENSIONS", 0)) or None
+similarity_threshold = 0.4
+# how long a streaming search waits after a page lands for more pages to share its embedding call
+stream_collect_seconds = float(os.environ.get("STREAM_COLLECT_SECONDS", 0.05))
+# wire stories republished by several outlets are embedded once per search
+dedupe_stats = {"articles": 0, "duplicates": 0, "embeddings_saved": 0}
+dedupe_stats_lock = threading.Lock()
+# a title/snippet vector summarises the whole article while the final score is its best chunk,
+# so a hit is only left uncrawled well below similarity_threshold. prefilter_stats keeps the
+# lowest snippet score of an article that went on to pass, the number to check before raising this
+prefilter_similarity_threshold = float(os.environ.get("PREFILTER_SIMILARITY_THRESHOLD", 0.25))
+prefilter_stats = {"queries": 0, "candidates": 0, "store_hits": 0, "skipped_no_parser": 0,
+                   "skipped_low_similarity": 0, "min_passing_snippet_similarity": None}
+prefilter_stats_lock = threading.Lock()
 
 
 def _request_search_api(query: str, target: str) -> dict:
@@ -53,8 +99,14 @@ def _request_search_api(query: str, target: str) -> dict:
         start=start,
         end=end
     )
-    response = requests.get(url)
-    return response.json()
+
+    def request_search_api() -> dict:
+        response = http_client.get(url)
+        # quota and rate limit errors must not be cached
+        response.raise_for_status()
+        return response.json()
+
+    return search_api_cache.get_or_create((normalize_query(query), target, start, end), request_search_api)
 
 
 def get_news_items(query: str, target: str) -> List[dict]:
@@ -82,167 +134,294 @@ def get_news_items(query: str, target: str) -> List[dict]:
         metatags = news_item["pagemap"]["metatags"][0]
         if "article:published_time" in metatags:
             parsed_news["published_at"] = parser.parse(metatags["article:published_time"])
+        parsed_news["snippet"] = metatags.get("og:description") or news_item.get("snippet", "")
         result.append(parsed_news)
     return result
 
 
-def get_publisher(url: str) -> str:
-    publisher = ""
-    if url.startswith("https://news.einfomax.co.kr"):
-        publisher = "연합 인포맥스"
-    elif url.startswith("https://www.hankyung.com"):
-        publisher = "한국경제"
-    elif url.startswith("https://www.mk.co.kr"):
-        publisher = "매일경제"
-    elif url.startswith("https://www.businesspost.co.kr"):
-        publisher = "비즈니스 포스트"
-    elif url.startswith("https://finance.yahoo.com/"):
-        publisher = "yahoo finance"
-    elif url.startswith("https://www.investing.com/"):
-        publisher = "investing.com"
-    elif url.startswith("https://www.bloomberg.com/"):
-        publisher = "bloomberg"
-    return publisher
-
-
-def search_news(query: str, query_embedding: List[float], target: str) -> List[dict]:
+def prefilter_news_items(news_items: List[dict], query_embedding: QueryEmbeddings) -> List[dict]:
+    # a stored article costs no fetch and is scored exactly, so it skips the snippet guess
+    is_stored_list = [article_store.contains(x["url"], EMBEDDING_MODEL, EMBEDDING_DIMENSIONS) for x in news_items]
+    candidates = [x for x, is_stored in zip(news_items, is_stored_list)
+                  if not is_stored and get_article_parser(x["url"])]
+    passed = set()
+    if candidates:
+        snippet_list = [f"{x['title']}\n{x.get('snippet', '')}" for x in candidates]
+        query_matrix = np.atleast_2d(np.asarray(query_embedding, dtype=np.float32))
+        similarities = get_embedding_matrix(snippet_list).dot(query_matrix.T).max(axis=1)
+        for news_item, similarity in zip(candidates, similarities):
+            news_item["snippet_similarity"] = float(similarity)
+            if similarity > prefilter_similarity_threshold:
+                passed.add(id(news_item))
+    with prefilter_stats_lock:
+        prefilter_stats["queries"] += 1
+        prefilter_stats["candidates"] += len(news_items)
+        prefilter_stats["store_hits"] += sum(is_stored_list)
+        prefilter_stats["skipped_no_parser"] += len(news_items) - sum(is_stored_list) - len(candidates)
+        prefilter_stats["skipped_low_similarity"] += len(candidates) - len(passed)
+    return [x for x, is_stored in zip(news_items, is_stored_list) if is_stored or id(x) in passed]
+
+
+def record_passing_snippet_similarity(news_item: dict):
+    if "snippet_similarity" not in news_item:
+        return
+    with prefilter_stats_lock:
+        lowest = prefilter_stats["min_passing_snippet_similarity"]
+        if lowest is None or news_item["snippet_similarity"] < lowest:
+            prefilter_stats["min_passing_snippet_similarity"] = news_item["snippet_similarity"]
+
+
+def get_prefilter_stats() -> dict:
+    with prefilter_stats_lock:
+        stats = dict(prefilter_stats)
+    stats["fetches_avoided"] = stats["skipped_no_parser"] + stats["skipped_low_similarity"]
+    stats["fetches_avoided_per_query"] = stats["fetches_avoided"] / stats["queries"] if stats["queries"] else 0.0
+    return stats
+
+
+def get_search_stats() -> dict:
+    # flat running totals, so the difference of two snapshots is what the searches in between saved
+    prefilter = get_prefilter_stats()
+    stats = {key: prefilter[key] for key in
+             ["queries", "candidates", "store_hits", "skipped_no_parser", "skipped_low_similarity", "fetches_avoided"]}
+    with dedupe_stats_lock:
+        stats.update({f"dedupe_{key}": value for key, value in dedupe_stats.items()})
+    stats.update(get_crawl_stats())
+    return stats
+
+
+def search_news(query: str, query_embedding: QueryEmbeddings, target: str,
+                cancel_event: Optional[threading.Event] = None,
+                dedupe_index: Optional[SimHashIndex] = None) -> List[dict]:
     news_items = get_news_items(query, target)
+    news_items = prefilter_news_items(news_items, query_embedding)
+    if cancel_event is not None and cancel_event.is_set():
+        print("SEARCH CANCELLED", query, target)
+        return []
     info_list = [(news_item, query_embedding) for news_item in news_items]
-    news_items = parallel_request_parse_articles(info_list)
-    news_items = [x for x in news_items if x["similarity"] > 0.4]
+    news_items = parallel_request_parse_articles(info_list, cancel_event, dedupe_index)
+    news_items = [x for x in news_items if x["similarity"] > similarity_threshold]
+    for news_item in news_items:
+        record_passing_snippet_similarity(news_item)
     return news_items
 
 
-def parse_article_einfomax(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_content = soup.find("article", id="article-view-content-div").text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-
-def parse_article_hankyung(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_content = soup.find("div", id="articletxt").text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-
-def parse_article_mk(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_content = soup.find("div", attrs={"itemprop": "articleBody"}).text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-
-def parse_article_bp(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_soup = soup.find("div", class_="detail_editor")
-    if article_soup is None:
-        return ""
-    article_content = article_soup.text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-
-def parse_article_cbiz(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_soup = soup.find("script", id="fusion-metadata")
-    if article_soup is None:
-        return ""
-    article_content = article_soup.text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-
-def parse_article_yf(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_soup = soup.find("div", class_="caas-body")
-    if article_soup is None:
-        return ""
-    article_content = article_soup.text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-def parse_article_investing(article_html: str) -> str:
-    soup = BeautifulSoup(article_html, "lxml")
-    article_soup = soup.find("div", class_="WYSIWYG")
-    if article_soup is None:
-        return ""
-    article_content = article_soup.text
-    article_content = remove_urls(article_content)
-    return article_content.strip()
-
-
-def parse_article(url: str, article_html: str) -> str:
-    if url.startswith("https://news.einfomax.co.kr"):
-        return parse_article_einfomax(article_html)
-    elif url.startswith("https://www.hankyung.com"):
-        return parse_article_hankyung(article_html)
-    elif url.startswith("https://www.mk.co.kr/"):
-        return parse_article_mk(article_html)
-    elif url.startswith("https://www.businesspost.co.kr/"):
-        return parse_article_bp(article_html)
-    elif url.startswith("https://finance.yahoo.com"):
-        return parse_article_yf(article_html)
-    elif url.startswith("https://www.investing.com/"):
-        return parse_article_investing(article_html)
+def iter_search_news(query: str, query_embedding: QueryEmbeddings, target: str,
+                     dedupe_index: Optional[SimHashIndex] = None,
+                     cancel_event: Optional[threading.Event] = None) -> Iterator[dict]:
+    news_items = get_news_items(query, target)
+    news_items = prefilter_news_items(news_items, query_embedding)
+    if dedupe_index is None:
+        dedupe_index = SimHashIndex()
+    missing_news_items = {}
+    for news_item in news_items:
+        stored = article_store.get(news_item["url"], EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+        if stored is None:
+            missing_news_items[news_item["url"]] = news_item
+            continue
+        stored_news_item = load_stored_article(news_item, stored, query_embedding, dedupe_index)
+        if stored_news_item is not None and stored_news_item["similarity"] > similarity_threshold:
+            record_passing_snippet_similarity(stored_news_item)
+            yield stored_news_item
+    # pages arrive in the order they finish, anything still loading at the deadline never arrives.
+    # pages landing within stream_collect_seconds of each other are parsed together and embedded in one call
+    for article_html_dict in iter_crawl_articles(list(missing_news_items), crawl_deadline_seconds, cancel_event,
+                                                 stream_collect_seconds):
+        if cancel_event is not None and cancel_event.is_set():
+            print("SEARCH CANCELLED", query, target)
+            break
+        fetched_list = get_executor("parse").map(
+            process_article, [missing_news_items[url] for url in article_html_dict], article_html_dict.values()
+        )
+        fetched_list = [x for x in fetched_list if x is not None and not is_duplicate_article(x, dedupe_index)]
+        for news_item in score_articles(fetched_list, [query_embedding] * len(fetched_list)):
+            if news_item["similarity"] > similarity_threshold:
+                record_passing_snippet_similarity(news_item)
+                yield news_item
+
+
+def stream_search_news(news_tasks: List[Tuple[str, QueryEmbeddings, str]],
+                       dedupe_index: Optional[SimHashIndex] = None,
+                       cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[Optional[dict], int]]:
+    # every target streams into one queue and is drained on the caller's thread.
+    # yields (news_item, finished targets) per scored article and (None, finished targets) per finished target
+    if dedupe_index is None:
+        dedupe_index = SimHashIndex()
+    # closing the stream early sets this, so the producers stop crawling for a reader that is gone
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    news_queue = queue.Queue()
+
+    def produce_news(query: str, query_embedding: QueryEmbeddings, target: str):
+        try:
+            for news_item in iter_search_news(query, query_embedding, target, dedupe_index, cancel_event):
+                news_queue.put(news_item)
+        finally:
+            news_queue.put(None)
+
+    executor = get_executor("search")
+    futures = [executor.submit(produce_news, *x) for x in news_tasks]
+    finished = 0
+    try:
+        while finished < len(news_tasks):
+            news_item = news_queue.get()
+            if news_item is None:
+                finished += 1
+            yield news_item, finished
+    finally:
+        cancel_event.set()
+    for future in futures:
+        if future.exception() is not None:
+            print("NEWS TARGET FAILED", future.exception())
 
 
 def parse_related_paragraph(query_embedding: List[float], article: str) -> Tuple[int, float, str]:
-    query_embedding = np.array(query_embedding)
     text_chunks = text_splitter.split_text(article)
-    embeddings = get_embedding(text_chunks)
-    similarity_list = []
-    for i, (embedding, text_chunk) in enumerate(zip(embeddings, text_chunks)):
-        similarity = query_embedding.dot(embedding)
-        similarity_list.append((i, similarity, text_chunk))
-    return sorted(similarity_list, key=lambda x: x[0], reverse=True)[0]
-
-
-def crawl_with_curl(url: str) -> str:
-    curl_cmd = ["curl",
-                "-L",
-                "-w", " - status code: %{http_code}, sizes: %{size_request}/%{size_download}",
-                url,
-                "-H", "user-agent: Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Mobile Safari/537.36"]
-    result = subprocess.run(curl_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    article_html = result.stdout
-    return article_html
-
-
-def crawl_with_requests(url: str) -> str:
-    response = requests.get(
-        url=url,
-        headers={
-            'User-Agent': 'Mozilla/5.0',
-        }
-    )
-    article_html = response.text
-    return article_html
+    scores, indices = top_k_similarity(query_embedding, get_embedding_matrix(text_chunks), top_k=1)
+    idx = int(indices[0][0])
+    return idx, float(scores[0][0]), text_chunks[idx]
 
 
-def request_parse_article(info: Tuple[dict, List[float]]) -> Optional[dict]:
-    news_item, query_embedding = info
-    url = news_item["url"]
-    if url.startswith("https://www.investing.com"):
-        article_html = crawl_with_curl(url)
-    else:
-        article_html = crawl_with_requests(url)
-    uploaded_news_url = upload_news_html(url, article_html)
-    article_content = parse_article(url, article_html)
-    if not article_content:
+def process_article(news_item: dict, article_html: str) -> Optional[Tuple[dict, str, List[str]]]:
+    # one unparseable page drops that article, not the whole batch
+    try:
+        parsed = parse_article_content(news_item["url"], article_html)
+    except Exception as e:
+        print("SKIP ARTICLE", news_item["url"], e)
+        return None
+    if parsed is None:
+        return None
+    article_content, article_chunks = parsed
+    return news_item, article_content, article_chunks
+
+
+def get_news_reference(url_hash: str, chunk_index: int) -> Optional[dict]:
+    stored = article_store.get_text(url_hash)
+    if stored is None or not 0 <= chunk_index < len(stored["chunks"]):
+        return None
+    # only pages from registered publishers are ever fetched for the reference page
+    if get_publisher_config(stored["url"]) is None:
         return None
-    idx, similarity, related_paragraph = parse_related_paragraph(query_embedding, article_content)
+    return {"url": stored["url"], "related_paragraph": stored["chunks"][chunk_index]}
+
+
+def get_saved_news_reference(related_news: List[dict], news_index: int) -> Optional[dict]:
+    # a saved answer keeps each article's url and paragraph, so its links outlive the article store
+    if not 0 <= news_index < len(related_news):
+        return None
+    news_item = related_news[news_index]
+    if get_publisher_config(news_item["url"]) is None:
+        return None
+    return {"url": news_item["url"], "related_paragraph": news_item["related_paragraph"]}
+
+
+def upload_news_page(url: str) -> str:
+    # only runs when a reference page is opened, so unopened articles never reach storage
+    if get_publisher_config(url) is None:
+        raise ValueError(f"Not a registered publisher: {url}")
+    stored = html_store.get(url)
+    article_html = stored["html"] if stored is not None else crawl_article(url)
+    return upload_news_html(url, article_html)
+
+
+def score_article(news_item: dict, article_chunks: List[str], article_embeddings: np.ndarray,
+                  query_embedding: QueryEmbeddings) -> dict:
+    # fresh and stored articles are both scored at the store's precision, so a store hit never moves a score
+    quantized = QuantizedEmbeddings(article_embeddings, article_store.storage_mode, article_prefix_dimensions)
+    scores, indices = quantized.search(np.atleast_2d(np.asarray(query_embedding, dtype=np.float32)), top_k=1)
+    # the article keeps its best chunk against whichever question embedding matches it best
+    best = int(np.argmax(scores[:, 0]))
+    idx = int(indices[best][0])
     news_item["index"] = idx
-    news_item["similarity"] = similarity
-    news_item["related_paragraph"] = related_paragraph
-    news_item["uploaded_news_url"] = uploaded_news_url
+    news_item["similarity"] = float(scores[best][0])
+    news_item["related_paragraph"] = article_chunks[idx]
     return news_item
 
 
-def parallel_request_parse_articles(info_list: List[Tuple[dict, List[float]]]) -> List[dict]:
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        news_items = executor.map(request_parse_article, info_list)
-    news_items = [x for x in news_items if x]
+def is_duplicate_article(fetched: Tuple[dict, str, List[str]], dedupe_index: Optional[SimHashIndex]) -> bool:
+    if dedupe_index is None:
+        return False
+    news_item, article_content, article_chunks = fetched
+    duplicate_url = dedupe_index.find_or_add(news_item["url"], article_content)
+    with dedupe_stats_lock:
+        dedupe_stats["articles"] += 1
+        if duplicate_url is not None:
+            dedupe_stats["duplicates"] += 1
+            dedupe_stats["embeddings_saved"] += len(article_chunks)
+    if duplicate_url is not None:
+        print("SKIP DUPLICATE ARTICLE", news_item["url"], "of", duplicate_url)
+    return duplicate_url is not None
+
+
+def load_stored_article(news_item: dict, stored: dict, query_embedding: QueryEmbeddings,
+                        dedupe_index: Optional[SimHashIndex] = None) -> Optional[dict]:
+    # a stored article skips the crawl, the parser and the embedding call, None if it repeats an earlier story
+    if dedupe_index is not None:
+        # stored copies cost no embeddings, they only claim the story for the fetched ones
+        duplicate_url = dedupe_index.find_or_add(news_item["url"], stored["text"])
+        with dedupe_stats_lock:
+            dedupe_stats["articles"] += 1
+            if duplicate_url is not None:
+                dedupe_stats["duplicates"] += 1
+        if duplicate_url is not None:
+            print("SKIP DUPLICATE ARTICLE", news_item["url"], "of", duplicate_url)
+            return None
+    return score_article(news_item, stored["chunks"], stored["embeddings"], query_embedding)
+
+
+def score_articles(fetched_list: List[Tuple[dict, str, List[str]]],
+                   query_embeddings: List[QueryEmbeddings]) -> List[dict]:
+    text_chunks = [text_chunk for _, _, article_chunks in fetched_list for text_chunk in article_chunks]
+    if not text_chunks:
+        return []
+    # every chunk of every article goes out in one token-packed embedding call
+    embeddings = paginated_get_embedding_matrix(text_chunks)
+    news_items = []
+    offset = 0
+    for (news_item, article_content, article_chunks), query_embedding in zip(fetched_list, query_embeddings):
+        article_embeddings = embeddings[offset:offset + len(article_chunks)]
+        offset += len(article_chunks)
+        if not article_chunks:
+            continue
+        article_store.put(news_item["url"], EMBEDDING_MODEL, EMBEDDING_DIMENSIONS,
+                          article_content, article_chunks, article_embeddings)
+        news_items.append(score_article(news_item, article_chunks, article_embeddings, query_embedding))
     return news_items
 
+
+def parallel_request_parse_articles(info_list: List[Tuple[dict, QueryEmbeddings]],
+                                    cancel_event: Optional[threading.Event] = None,
+                                    dedupe_index: Optional[SimHashIndex] = None) -> List[dict]:
+    # callers searching several targets share one index, so a wire story on yf and investing is embedded once
+    if dedupe_index is None:
+        dedupe_index = SimHashIndex()
+    stored_news_items = []
+    missing_info_list = []
+    for news_item, query_embedding in info_list:
+        stored = article_store.get(news_item["url"], EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+        if stored is None:
+            missing_info_list.append((news_item, query_embedding))
+            continue
+        stored_news_item = load_stored_article(news_item, stored, query_embedding, dedupe_index)
+        if stored_news_item is not None:
+            stored_news_items.append(stored_news_item)
+    info_list = missing_info_list
+    if not info_list:
+        return stored_news_items
+    # articles still loading at the crawl deadline are dropped, the rest go on
+    article_html_dict, crawl_timings = crawl_articles([news_item["url"] for news_item, _ in info_list])
+    info_list = [x for x in info_list if x[0]["url"] in article_html_dict]
+    for news_item, _ in info_list:
+        news_item["crawl_seconds"] = crawl_timings[news_item["url"]]["fetch_seconds"]
+    fetched_list = list(get_executor("parse").map(
+        process_article,
+        [news_item for news_item, _ in info_list],
+        [article_html_dict[news_item["url"]] for news_item, _ in info_list],
+    ))
+    # first copy in search rank order wins, the rest are never embedded
+    is_kept_list = [fetched is not None and not is_duplicate_article(fetched, dedupe_index) for fetched in fetched_list]
+    query_embeddings = [query_embedding for is_kept, (_, query_embedding) in zip(is_kept_list, info_list) if is_kept]
+    fetched_list = [fetched for is_kept, fetched in zip(is_kept_list, fetched_list) if is_kept]
+    if cancel_event is not None and cancel_event.is_set():
+        return []
+    return stored_news_items + score_articles(fetched_list, query_embeddings)
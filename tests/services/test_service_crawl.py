@@ -0,0 +1,161 @@
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from services import service_crawl
+from services.service_crawl import (
+    crawl_articles,
+    crawl_like_curl,
+    crawl_with_curl,
+    crawl_with_curl_headers,
+    crawl_with_requests,
+    iter_crawl_articles,
+)
+from utils.article_util import HtmlStore
+
+
+class InvestingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    user_agents = []
+
+    def do_GET(self):
+        InvestingHandler.user_agents.append(self.headers.get("User-Agent"))
+        if self.path == "/news/moved":
+            self.send_response(301)
+            self.send_header("Location", "/news/article")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/news/cached" and self.headers.get("If-None-Match") == "\"v1\"":
+            self.send_response(304)
+            self.send_header("ETag", "\"v1\"")
+            self.end_headers()
+            return
+        if self.path == "/news/hanging":
+            time.sleep(3)
+        if self.path == "/news/blocked":
+            status, body = 403, "blocked".encode()
+        else:
+            status, body = 200, "<div class=\"WYSIWYG\">금리 인하</div>".encode()
+        self.send_response(status)
+        if self.path == "/news/cached":
+            self.send_header("ETag", "\"v1\"")
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    InvestingHandler.user_agents = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InvestingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_crawl_with_curl_headers_matches_curl(server_url: str):
+    article_html = crawl_with_curl_headers(f"{server_url}/news/moved")
+    assert article_html == "<div class=\"WYSIWYG\">금리 인하</div>"
+    assert InvestingHandler.user_agents == [service_crawl.curl_user_agent] * 2
+    curl_html = crawl_with_curl(f"{server_url}/news/moved")
+    assert curl_html.startswith(article_html)
+
+
+def test_crawl_like_curl_falls_back_to_curl(server_url: str, monkeypatch):
+    monkeypatch.setattr(service_crawl, "crawl_with_curl", lambda url, timeout=None: "from curl")
+    assert crawl_like_curl(f"{server_url}/news/blocked") == "from curl"
+    assert crawl_like_curl(f"{server_url}/news/article") != "from curl"
+
+
+def test_crawl_with_curl_times_out(server_url: str):
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        crawl_with_curl(f"{server_url}/news/hanging", timeout=(0.5, 0.5))
+    assert time.perf_counter() - start < 2
+
+
+def test_crawl_with_curl_kills_hanging_process(monkeypatch):
+    def run(cmd, timeout=None, **kwargs):
+        assert cmd[cmd.index("--max-time") + 1] == "18.05"
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    monkeypatch.setattr(service_crawl.subprocess, "run", run)
+    with pytest.raises(requests.Timeout):
+        crawl_with_curl("https://www.investing.com/news/1", timeout=(3.05, 15))
+
+
+def test_crawl_articles_returns_partial_results(monkeypatch):
+    def crawl_article(url: str) -> str:
+        if url.endswith("slow"):
+            time.sleep(1)
+        if url.endswith("broken"):
+            raise ConnectionError("reset")
+        return f"<html>{url}</html>"
+
+    monkeypatch.setattr(service_crawl, "crawl_article", crawl_article)
+    urls = ["https://a.com/fast", "https://b.com/slow", "https://c.com/broken"]
+    start = time.perf_counter()
+    article_html_dict, timings = crawl_articles(urls, deadline=0.2)
+    assert time.perf_counter() - start < 0.5
+    assert article_html_dict == {"https://a.com/fast": "<html>https://a.com/fast</html>"}
+    assert timings["https://b.com/slow"]["status"] == "cancelled"
+    assert timings["https://c.com/broken"]["status"] == "error"
+    assert timings["https://a.com/fast"]["fetch_seconds"] < 0.2
+
+
+
+def test_iter_crawl_articles_yields_as_pages_land_and_stops_on_cancel(monkeypatch):
+    release = threading.Event()
+
+    def crawl_article(url: str) -> str:
+        if url.endswith("hanging"):
+            release.wait(5)
+        elif url.endswith("slow"):
+            time.sleep(0.2)
+        return f"<html>{url}</html>"
+
+    monkeypatch.setattr(service_crawl, "crawl_article", crawl_article)
+    urls = ["https://a.com/slow", "https://b.com/fast", "https://c.com/hanging"]
+    cancel_event = threading.Event()
+    stream = iter_crawl_articles(urls, deadline=5, cancel_event=cancel_event)
+    try:
+        assert [next(stream), next(stream)] == [{"https://b.com/fast": "<html>https://b.com/fast</html>"},
+                                                {"https://a.com/slow": "<html>https://a.com/slow</html>"}]
+        threading.Timer(0.1, cancel_event.set).start()
+        start = time.perf_counter()
+        assert list(stream) == []
+        assert time.perf_counter() - start < 1
+    finally:
+        release.set()
+
+
+def test_iter_crawl_articles_collects_pages_landing_together(monkeypatch):
+    def crawl_article(url: str) -> str:
+        time.sleep(float(url.rsplit("/", 1)[1]))
+        return f"<html>{url}</html>"
+
+    monkeypatch.setattr(service_crawl, "crawl_article", crawl_article)
+    urls = ["https://a.com/0.0", "https://b.com/0.05", "https://c.com/0.4"]
+    batches = list(iter_crawl_articles(urls, deadline=5, collect_seconds=0.2))
+    # the second page lands inside the first one's window, the third one well after it
+    assert [sorted(x) for x in batches] == [urls[:2], urls[2:]]
+
+def test_crawl_with_requests_revalidates(server_url: str, tmp_path, monkeypatch):
+    monkeypatch.setattr(service_crawl, "html_store", HtmlStore(str(tmp_path / "html.sqlite3")))
+    monkeypatch.setattr(service_crawl, "revalidation_stats", {})
+    article_html = crawl_with_requests(f"{server_url}/news/cached")
+    assert crawl_with_requests(f"{server_url}/news/cached") == article_html
+    stats = service_crawl.revalidation_stats["127.0.0.1"]
+    assert stats["requests"] == 2
+    assert stats["not_modified"] == 1
+    assert stats["bytes_saved"] == len("<div class=\"WYSIWYG\">금리 인하</div>".encode())
@@ -0,0 +1,33 @@
+import pytest
+
+from services import service_parse
+from services.service_parse import parse_and_split, parse_article_content, unpack_parsed_article
+
+
+@pytest.fixture(scope="session")
+def article_yf_html() -> str:
+    with open("tests/services/data/article_yf.html") as fr:
+        html = fr.read()
+        return html
+
+
+def test_parse_and_split_returns_offsets(article_yf_html: str):
+    article_content, chunk_offsets, article_chunks = parse_and_split("https://finance.yahoo.com/news/1.html",
+                                                                     article_yf_html)
+    assert article_chunks is None
+    assert unpack_parsed_article((article_content, chunk_offsets, None))[1] == \
+        service_parse.text_splitter.split_text(article_content)
+
+
+def test_parse_article_content_unknown_publisher(article_yf_html: str):
+    assert parse_article_content("https://www.example.com/news/1", article_yf_html) is None
+
+
+def test_parse_article_content_in_process_pool(article_yf_html: str, monkeypatch):
+    url = "https://finance.yahoo.com/news/1.html"
+    expected = parse_article_content(url, article_yf_html)
+    monkeypatch.setattr(service_parse, "parse_mode", "process")
+    monkeypatch.setattr(service_parse, "parse_workers", 1)
+    assert parse_article_content(url, article_yf_html) == expected
+    service_parse.parse_executor.shutdown()
+    monkeypatch.setattr(service_parse, "parse_executor", None)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+import services.service_pinecone as service_pinecone
+from services.service_pinecone import fetch_report, multi_query, search_reports
+
+QUERY_EMBEDDING = [0.1, 0.2, 0.3]
+
+
+def match(id_: str, score: float, **metadata) -> dict:
+    return {"id": id_, "score": score, "metadata": metadata}
+
+
+class FakeIndex:
+    def __init__(self, matches: dict, delay: float = 0.0):
+        self.matches = matches
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def query(self, vector, top_k, namespace, include_metadata, filter=None):
+        with self.lock:
+            self.calls.append((namespace, filter))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {"matches": self.matches.get(namespace, [])[:top_k]}
+
+    def fetch(self, ids, namespace):
+        vectors = {x["id"]: x for x in self.matches.get(namespace, []) if x["id"] in ids}
+        return {"vectors": vectors}
+
+
+@pytest.fixture
+def fake_index(monkeypatch):
+    fake_index = FakeIndex({
+        "fnguide": [match("f1", 0.9, hashkey="a"), match("f2", 0.8, hashkey="a"), match("f3", 0.7, hashkey="b")],
+        "investment_bank_v2": [match("i1", 0.85), match("f1", 0.95)],
+        "seeking-alpha-analysis-summary": [match("s1", 0.9, id="r1"), match("s2", 0.4, id="r2")],
+        "seeking-alpha-analysis-content": [match("c1", 0.8, id="r1"), match("c2", 0.7, id="r1")],
+    }, delay=0.05)
+    monkeypatch.setattr(service_pinecone, "index", fake_index)
+    return fake_index
+
+
+def test_multi_query_runs_namespaces_concurrently(fake_index: FakeIndex):
+    result = multi_query(QUERY_EMBEDDING, [("fnguide", 3, None), ("investment_bank_v2", 3, None)])
+    assert fake_index.max_active == 2
+    assert set(result["latency"]) == {"fnguide", "investment_bank_v2"}
+    assert len(result["namespaces"]["fnguide"]) == 3
+    # the same id from two namespaces is kept once, at its best score
+    assert [x["id"] for x in result["matches"]] == ["f1", "i1", "f2", "f3"]
+    assert result["matches"][0]["score"] == 0.95
+
+
+def test_search_reports(fake_index: FakeIndex):
+    report_results = search_reports(QUERY_EMBEDDING)
+    assert [report_type for report_type, _ in report_results] == ["domestic", "oversea", "oversea"]
+    domestic, seeking_alpha, investment_bank = [report_list for _, report_list in report_results]
+    assert [x["id"] for x in domestic] == ["f1", "f3"]
+    assert [x["id"] for x in seeking_alpha] == ["c1"]
+    assert [x["id"] for x in investment_bank] == ["i1", "f1"]
+    assert ("seeking-alpha-analysis-content", {"id": {"$in": ["r1"]}}) in fake_index.calls
+    # the summary -> content chain overlaps the independent namespaces
+    assert fake_index.max_active == 3
+
+
+def test_search_reports_domestic_only(fake_index: FakeIndex):
+    report_results = search_reports(QUERY_EMBEDDING, oversea=False)
+    assert [report_type for report_type, _ in report_results] == ["domestic"]
+    assert [namespace for namespace, _ in fake_index.calls] == ["fnguide"]
+
+
+def test_fetch_report_by_namespace_and_id(fake_index: FakeIndex):
+    domestic, _, _ = [report_list for _, report_list in search_reports(QUERY_EMBEDDING)]
+    assert domestic[0]["metadata"]["namespace"] == "fnguide"
+    assert fetch_report("fnguide", domestic[0]["id"])["metadata"]["hashkey"] == "a"
+    assert fetch_report("fnguide", "missing") is None
+    # only report namespaces can be read back through a reference page link
+    assert fetch_report("seeking-alpha-analysis-summary", "s1") is None
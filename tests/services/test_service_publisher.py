@@ -0,0 +1,38 @@
+import pytest
+
+from services.service_publisher import (
+    FETCH_CURL,
+    FETCH_REQUESTS,
+    get_article_parser,
+    get_publisher,
+    get_publisher_config,
+    parse_article,
+)
+
+
+@pytest.mark.parametrize("url, publisher", [
+    ("https://news.einfomax.co.kr/news/articleView.html?idxno=4296538", "연합 인포맥스"),
+    ("https://www.hankyung.com/article/2024050812345", "한국경제"),
+    ("https://www.mk.co.kr/news/stock/11011111", "매일경제"),
+    ("https://finance.yahoo.com/news/fed-holds-rates-160000034.html", "yahoo finance"),
+    ("https://www.bloomberg.com/news/articles/2024-05-08/fed", "bloomberg"),
+    ("https://www.example.com/news/1", ""),
+])
+def test_get_publisher(url: str, publisher: str):
+    assert get_publisher(url) == publisher
+
+
+def test_publisher_fetch_strategy():
+    assert get_publisher_config("https://www.investing.com/news/stock-market-news/1")["fetch"] == FETCH_CURL
+    assert get_publisher_config("https://finance.yahoo.com/news/1.html")["fetch"] == FETCH_REQUESTS
+    assert get_publisher_config("https://www.example.com/news/1") is None
+
+
+def test_article_parser_by_host():
+    assert get_article_parser("https://www.bloomberg.com/news/articles/1") is None
+    assert get_article_parser("https://www.example.com/news/1") is None
+    with open("tests/services/data/article_investing.html") as fr:
+        article_html = fr.read()
+    article_content = parse_article("https://www.investing.com/news/stock-market-news/1", article_html)
+    assert len(article_content) > 100
+    assert parse_article("https://www.example.com/news/1", article_html) == ""
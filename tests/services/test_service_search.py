@@ -1,10 +1,21 @@
 import json
-from typing import List
+import threading
+import time
+from hashlib import md5
+from typing import Dict, Iterator, List
 
+import numpy as np
 import pytest
 
-from services.service_search import (get_news_items, parse_article_einfomax, parse_related_paragraph,
-                                     parse_article_hankyung, parse_article_mk, parse_article_bp, parse_article_yf)
+import services.service_crawl as service_crawl
+import services.service_search as service_search
+from services.service_search import (EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, get_news_items, get_prefilter_stats,
+                                     parse_article_einfomax, parse_related_paragraph, parse_article_hankyung,
+                                     parse_article_mk, parse_article_bp, parse_article_yf,
+                                     parallel_request_parse_articles, prefilter_news_items, score_article,
+                                     score_articles, search_news, iter_search_news, stream_search_news,
+                                     get_news_reference, get_saved_news_reference, upload_news_page, get_search_stats)
+from utils.article_util import ArticleStore, SimHashIndex, get_url_hash
 
 
 @pytest.fixture(scope="session")
@@ -33,6 +44,84 @@ def eng_query_embedding() -> List[float]:
         return query_embedding
 
 
+def get_fake_embedding_matrix(text_list: List[str]) -> np.ndarray:
+    embeddings = np.stack([
+        np.random.default_rng(int(md5(text.encode()).hexdigest()[:8], 16)).standard_normal(EMBEDDING_DIMENSIONS)
+        for text in text_list
+    ]).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def get_article_text(key: str) -> str:
+    # unrelated lines, so no two test articles look like copies of one story
+    return "\n".join(md5(f"{key}-{i}".encode()).hexdigest() for i in range(8))
+
+
+def get_vector_at_similarity(similarity: float) -> np.ndarray:
+    # unit vector whose dot product with the first axis is exactly the given similarity
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    vector[0] = similarity
+    vector[1] = np.sqrt(1 - similarity ** 2)
+    return vector
+
+
+def get_news_item(key: str) -> dict:
+    return {"title": key, "url": f"https://news.einfomax.co.kr/news/{key}", "snippet": ""}
+
+
+class FakePipeline:
+    # stands in for the network, the parser and the embedding api behind service_search
+    def __init__(self):
+        self.pages: Dict[str, str] = {}
+        self.delays: Dict[str, float] = {}
+        self.embedded: List[List[str]] = []
+        self.release = threading.Event()
+
+    def crawl_articles(self, urls: List[str], deadline: float = 0.0):
+        article_html_dict = {url: self.pages[url] for url in urls if url in self.pages}
+        return article_html_dict, {url: {"fetch_seconds": 0.0} for url in urls}
+
+    def crawl_article(self, url: str) -> str:
+        # a negative delay hangs until the test is torn down
+        delay = self.delays.get(url, 0.0)
+        if delay < 0:
+            self.release.wait(5)
+        else:
+            time.sleep(delay)
+        return self.pages[url]
+
+    def parse_article_content(self, url: str, article_html: str):
+        if article_html == "broken":
+            raise ValueError("unparseable page")
+        return article_html, article_html.split("\n")
+
+    def paginated_get_embedding_matrix(self, text_list: List[str]) -> np.ndarray:
+        self.embedded.append(list(text_list))
+        return get_fake_embedding_matrix(text_list)
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch) -> Iterator[FakePipeline]:
+    pipeline = FakePipeline()
+    monkeypatch.setattr(service_search, "article_store", ArticleStore(str(tmp_path / "article.sqlite3")))
+    monkeypatch.setattr(service_search, "crawl_articles", pipeline.crawl_articles)
+    monkeypatch.setattr(service_search, "crawl_article", pipeline.crawl_article)
+    # streaming searches go through the real crawl loop, only the page fetch is faked
+    monkeypatch.setattr(service_crawl, "crawl_article", pipeline.crawl_article)
+    monkeypatch.setattr(service_search, "parse_article_content", pipeline.parse_article_content)
+    monkeypatch.setattr(service_search, "paginated_get_embedding_matrix", pipeline.paginated_get_embedding_matrix)
+    monkeypatch.setattr(service_search, "get_embedding_matrix", get_fake_embedding_matrix)
+    yield pipeline
+    pipeline.release.set()
+
+
+@pytest.fixture
+def accept_every_article(monkeypatch):
+    # fake embeddings are unrelated to the question, so both thresholds are opened up
+    monkeypatch.setattr(service_search, "prefilter_similarity_threshold", -1.0)
+    monkeypatch.setattr(service_search, "similarity_threshold", -1.0)
+
+
 @pytest.fixture(scope="session")
 def article_einfomax_html() -> str:
     with open("tests/services/data/article_einfomax.html") as fr:
@@ -73,6 +162,23 @@ def test_search_news(kor_query: str):
     assert 0 < len(result) <= 5
 
 
+def add_target(pipeline: FakePipeline, monkeypatch, target: str, delays: Dict[str, float]) -> List[dict]:
+    # one search target whose hits take the given seconds to fetch
+    news_items = [get_news_item(f"{target}-{key}") for key in delays]
+    for news_item, delay in zip(news_items, delays.values()):
+        pipeline.pages[news_item["url"]] = get_article_text(news_item["title"])
+        pipeline.delays[news_item["url"]] = delay
+    targets = getattr(service_search.get_news_items, "targets", {})
+    targets[target] = news_items
+
+    def get_news_items(query: str, target: str) -> List[dict]:
+        return [dict(x) for x in targets[target]]
+
+    get_news_items.targets = targets
+    monkeypatch.setattr(service_search, "get_news_items", get_news_items)
+    return news_items
+
+
 def test_parse_einfomax(article_einfomax_html: str):
     article_content = parse_article_einfomax(article_einfomax_html)
     assert article_content is not None
@@ -113,6 +219,224 @@ def test_tmp():
 
 def test_parse_related_paragraph(kor_query_embedding: List[float], article_einfomax_html: str):
     article_content = parse_article_einfomax(article_einfomax_html)
-    paragraph = parse_related_paragraph(kor_query_embedding, article_content)
+    idx, similarity, paragraph = parse_related_paragraph(kor_query_embedding, article_content)
     assert paragraph is not None
     assert len(paragraph) > 100
+    assert -1 <= similarity <= 1
+
+
+def test_score_article_scores_both_questions(kor_query_embedding: List[float], eng_query_embedding: List[float]):
+    article_embeddings = np.asarray([eng_query_embedding, np.asarray(kor_query_embedding) * 0.9], dtype=np.float32)
+    news_item = score_article({"url": "https://a.com/1"}, ["eng", "kor"], article_embeddings, kor_query_embedding)
+    assert news_item["related_paragraph"] == "kor"
+    assert news_item["similarity"] == pytest.approx(0.9, abs=1e-3)
+    news_item = score_article({"url": "https://a.com/1"}, ["eng", "kor"], article_embeddings,
+                              [kor_query_embedding, eng_query_embedding])
+    assert news_item["related_paragraph"] == "eng"
+    assert news_item["similarity"] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_score_articles_scatters_one_embedding_call(pipeline: FakePipeline):
+    fetched_list = []
+    for key in ["a", "b", "c"]:
+        article_text = get_article_text(key)
+        fetched_list.append((get_news_item(key), article_text, article_text.split("\n")))
+    # each article is asked about its own third chunk
+    query_embeddings = [get_fake_embedding_matrix([chunks[2]])[0] for _, _, chunks in fetched_list]
+    news_items = score_articles(fetched_list, query_embeddings)
+    assert len(pipeline.embedded) == 1
+    assert len(pipeline.embedded[0]) == 24
+    assert [x["url"] for x in news_items] == [x[0]["url"] for x in fetched_list]
+    assert [x["related_paragraph"] for x in news_items] == [chunks[2] for _, _, chunks in fetched_list]
+    assert all(x["similarity"] == pytest.approx(1.0, abs=1e-3) for x in news_items)
+
+
+def test_parallel_request_parse_articles_skips_failed_article(pipeline: FakePipeline):
+    news_items = [get_news_item(key) for key in ["a", "b", "c", "d"]]
+    for news_item in news_items:
+        pipeline.pages[news_item["url"]] = get_article_text(news_item["title"])
+    pipeline.pages[news_items[1]["url"]] = "broken"
+    del pipeline.pages[news_items[3]["url"]]
+    query_embedding = get_fake_embedding_matrix(["question"])[0]
+    result = parallel_request_parse_articles([(x, query_embedding) for x in news_items])
+    assert [x["url"] for x in result] == [news_items[0]["url"], news_items[2]["url"]]
+    assert len(pipeline.embedded) == 1
+
+
+def test_prefilter_news_items_threshold_boundary(pipeline: FakePipeline, monkeypatch):
+    threshold = service_search.prefilter_similarity_threshold
+    snippet_similarities = {"below": threshold - 0.01, "at": threshold, "above": threshold + 0.01}
+    monkeypatch.setattr(service_search, "get_embedding_matrix", lambda text_list: np.stack(
+        [get_vector_at_similarity(snippet_similarities[x.split("\n")[0]]) for x in text_list]
+    ))
+    news_items = [get_news_item(key) for key in ["below", "at", "above"]]
+    kept = prefilter_news_items(news_items, get_vector_at_similarity(1.0))
+    assert [x["title"] for x in kept] == ["above"]
+    assert kept[0]["snippet_similarity"] == pytest.approx(threshold + 0.01, abs=1e-6)
+
+
+def test_prefilter_news_items_keeps_store_hits(pipeline: FakePipeline, monkeypatch):
+    monkeypatch.setattr(service_search, "get_embedding_matrix", lambda text_list: np.stack(
+        [get_vector_at_similarity(0.0) for _ in text_list]
+    ))
+    stored, fresh = get_news_item("stored"), get_news_item("fresh")
+    unparsed = {"title": "unparsed", "url": "https://blog.example.com/unparsed", "snippet": ""}
+    service_search.article_store.put(stored["url"], EMBEDDING_MODEL, EMBEDDING_DIMENSIONS,
+                                     "stored", ["stored"], get_fake_embedding_matrix(["stored"]))
+    before = get_prefilter_stats()
+    # the stored article scores below the threshold on its snippet but is kept, it costs no fetch
+    assert prefilter_news_items([unparsed, stored, fresh], get_vector_at_similarity(1.0)) == [stored]
+    after = get_prefilter_stats()
+    assert after["store_hits"] - before["store_hits"] == 1
+    assert after["skipped_no_parser"] - before["skipped_no_parser"] == 1
+    assert after["skipped_low_similarity"] - before["skipped_low_similarity"] == 1
+    assert after["fetches_avoided"] - before["fetches_avoided"] == 2
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_search_news_dedupes_across_targets(pipeline: FakePipeline, monkeypatch):
+    target_urls = {"yf": "https://finance.yahoo.com/news/wire", "investing": "https://www.investing.com/news/wire"}
+    monkeypatch.setattr(service_search, "get_news_items", lambda query, target: [
+        {"title": "wire", "url": target_urls[target], "snippet": ""}
+    ])
+    # the same wire story carried by both targets
+    for url in target_urls.values():
+        pipeline.pages[url] = get_article_text("wire")
+    query_embedding = get_fake_embedding_matrix(["question"])[0]
+    dedupe_index = SimHashIndex()
+    yf_news = search_news("rate cut", query_embedding, "yf", dedupe_index=dedupe_index)
+    investing_news = search_news("rate cut", query_embedding, "investing", dedupe_index=dedupe_index)
+    assert [x["url"] for x in yf_news] == [target_urls["yf"]]
+    assert investing_news == []
+    assert len(pipeline.embedded) == 1
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_stored_duplicates_are_dropped_across_targets(pipeline: FakePipeline, monkeypatch):
+    target_urls = {"yf": "https://finance.yahoo.com/news/wire", "investing": "https://www.investing.com/news/wire"}
+    monkeypatch.setattr(service_search, "get_news_items", lambda query, target: [
+        {"title": "wire", "url": target_urls[target], "snippet": ""}
+    ])
+    # both copies of the wire story were stored by earlier questions, so neither is crawled
+    article_text = get_article_text("wire")
+    for url in target_urls.values():
+        service_search.article_store.put(url, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, article_text,
+                                         article_text.split("\n"), get_fake_embedding_matrix(article_text.split("\n")))
+    query_embedding = get_fake_embedding_matrix(["question"])[0]
+    before = get_search_stats()
+    for search in [search_news, iter_search_news]:
+        dedupe_index = SimHashIndex()
+        yf_news = list(search("rate cut", query_embedding, "yf", dedupe_index=dedupe_index))
+        investing_news = list(search("rate cut", query_embedding, "investing", dedupe_index=dedupe_index))
+        assert [x["url"] for x in yf_news] == [target_urls["yf"]]
+        assert investing_news == []
+    assert pipeline.embedded == []
+    after = get_search_stats()
+    assert after["dedupe_duplicates"] - before["dedupe_duplicates"] == 2
+    assert after["store_hits"] - before["store_hits"] == 4
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_iter_search_news_yields_as_articles_finish(pipeline: FakePipeline, monkeypatch):
+    news_items = add_target(pipeline, monkeypatch, "domestic", {"slow": 0.4, "fast": 0.0, "medium": 0.2})
+    start = time.perf_counter()
+    stream = iter_search_news("rate cut", get_fake_embedding_matrix(["question"])[0], "domestic")
+    first = next(stream)
+    assert first["url"] == news_items[1]["url"]
+    assert time.perf_counter() - start < 0.3
+    assert [x["url"] for x in stream] == [news_items[2]["url"], news_items[0]["url"]]
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_iter_search_news_embeds_pages_landing_together_in_one_call(pipeline: FakePipeline, monkeypatch):
+    monkeypatch.setattr(service_search, "stream_collect_seconds", 0.2)
+    news_items = add_target(pipeline, monkeypatch, "domestic", {"first": 0.0, "second": 0.05, "late": 0.5})
+    stream = iter_search_news("rate cut", get_fake_embedding_matrix(["question"])[0], "domestic")
+    assert sorted(x["url"] for x in stream) == sorted(x["url"] for x in news_items)
+    # eight chunks per article: the first two share a call, the late one gets its own
+    assert [len(x) for x in pipeline.embedded] == [16, 8]
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_iter_search_news_stops_at_crawl_deadline(pipeline: FakePipeline, monkeypatch):
+    monkeypatch.setattr(service_search, "crawl_deadline_seconds", 0.3)
+    news_items = add_target(pipeline, monkeypatch, "domestic", {"fast": 0.0, "hanging": -1})
+    start = time.perf_counter()
+    stream = iter_search_news("rate cut", get_fake_embedding_matrix(["question"])[0], "domestic")
+    assert [x["url"] for x in stream] == [news_items[0]["url"]]
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_iter_search_news_stops_on_cancel(pipeline: FakePipeline, monkeypatch):
+    news_items = add_target(pipeline, monkeypatch, "domestic", {"fast": 0.0, "hanging": -1})
+    cancel_event = threading.Event()
+    stream = iter_search_news("rate cut", get_fake_embedding_matrix(["question"])[0], "domestic",
+                              cancel_event=cancel_event)
+    assert next(stream)["url"] == news_items[0]["url"]
+    threading.Timer(0.1, cancel_event.set).start()
+    start = time.perf_counter()
+    assert list(stream) == []
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.usefixtures("accept_every_article")
+def test_stream_search_news_merges_targets(pipeline: FakePipeline, monkeypatch):
+    monkeypatch.setattr(service_search, "crawl_deadline_seconds", 0.5)
+    domestic = add_target(pipeline, monkeypatch, "domestic", {"fast": 0.0, "hanging": -1})
+    yf = add_target(pipeline, monkeypatch, "yf", {"medium": 0.2})
+    query_embedding = get_fake_embedding_matrix(["question"])[0]
+    news_tasks = [("금리 인하", query_embedding, "domestic"), ("rate cut", query_embedding, "yf")]
+    events = [(x["url"] if x else None, finished) for x, finished in stream_search_news(news_tasks)]
+    # each article as it is scored, the hanging one is dropped at the deadline
+    assert events == [(domestic[0]["url"], 0), (yf[0]["url"], 0), (None, 1), (None, 2)]
+
+
+def test_stream_search_news_stops_producers_when_closed(monkeypatch):
+    stopped = []
+
+    def iter_search_news(query: str, query_embedding: List[float], target: str, dedupe_index: SimHashIndex,
+                         cancel_event: threading.Event) -> Iterator[dict]:
+        yield get_news_item(target)
+        # a target still crawling: only the stream's cancel ends it
+        cancel_event.wait(5)
+        stopped.append(target)
+
+    monkeypatch.setattr(service_search, "iter_search_news", iter_search_news)
+    query_embedding = get_fake_embedding_matrix(["question"])[0]
+    stream = stream_search_news([("금리 인하", query_embedding, "domestic"), ("rate cut", query_embedding, "yf")])
+    next(stream)
+    stream.close()
+    deadline = time.monotonic() + 1
+    while len(stopped) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(stopped) == ["domestic", "yf"]
+
+
+def test_get_news_reference_reads_stored_chunk(pipeline: FakePipeline):
+    stored = get_news_item("stored")
+    unregistered_url = "https://blog.example.com/stored"
+    for url in [stored["url"], unregistered_url]:
+        service_search.article_store.put(url, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, "first\nsecond",
+                                         ["first", "second"], get_fake_embedding_matrix(["first", "second"]))
+    assert get_news_reference(get_url_hash(stored["url"]), 1) == {"url": stored["url"], "related_paragraph": "second"}
+    assert get_news_reference(get_url_hash(stored["url"]), 2) is None
+    assert get_news_reference(get_url_hash("https://news.einfomax.co.kr/news/missing"), 0) is None
+    # a stored page from a host outside the publisher registry is never framed
+    assert get_news_reference(get_url_hash(unregistered_url), 0) is None
+
+
+def test_get_saved_news_reference():
+    related_news = [
+        {"url": "https://news.einfomax.co.kr/news/1", "related_paragraph": "first"},
+        {"url": "http://169.254.169.254/latest/meta-data", "related_paragraph": "second"},
+    ]
+    assert get_saved_news_reference(related_news, 0) == {"url": related_news[0]["url"], "related_paragraph": "first"}
+    assert get_saved_news_reference(related_news, 1) is None
+    assert get_saved_news_reference(related_news, 2) is None
+
+
+def test_upload_news_page_rejects_unregistered_host():
+    for url in ["http://169.254.169.254/latest/meta-data", "https://blog.example.com/1"]:
+        with pytest.raises(ValueError):
+            upload_news_page(url)
@@ -0,0 +1,101 @@
+import sqlite3
+import time
+
+import numpy as np
+
+from utils.article_util import (ArticleStore, SimHashIndex, get_chunk_offsets, get_hamming_distance, get_simhash,
+                                get_url_hash)
+
+MODEL = "text-embedding-3-large"
+ARTICLE = ("미국 연방준비제도가 기준금리를 동결하면서 연내 금리 인하 기대가 커지고 있다. "
+           "시장에서는 물가 둔화가 이어질 경우 하반기부터 인하가 시작될 것으로 보고 있으며, "
+           "주식 시장은 기술주를 중심으로 강세를 보였다. 채권 금리는 하락했고 달러는 약세를 나타냈다. "
+           "전문가들은 고용 지표와 소비자물가 발표가 향후 통화정책 방향을 가를 변수라고 분석했다. "
+           "국내 증시 역시 외국인 순매수에 힘입어 상승 마감했으며 원달러 환율은 하락했다.")
+DIMENSIONS = 8
+
+
+def test_get_chunk_offsets():
+    text = "first paragraph.\nsecond paragraph.\nthird paragraph."
+    chunks = ["first paragraph.\nsecond", "second paragraph.", "paragraph.\nthird paragraph."]
+    offsets = get_chunk_offsets(text, chunks)
+    assert [text[start:end] for start, end in offsets] == chunks
+    assert get_chunk_offsets(text, ["missing"]) is None
+
+
+def test_article_store_round_trip(tmp_path):
+    store = ArticleStore(str(tmp_path / "article.sqlite3"), storage_mode="float32")
+    text = "aaa bbb ccc"
+    chunks = ["aaa bbb", "bbb ccc"]
+    embeddings = np.random.rand(2, DIMENSIONS).astype(np.float32)
+    assert store.get("https://a.com/1", MODEL, DIMENSIONS) is None
+    assert store.put("https://a.com/1", MODEL, DIMENSIONS, text, chunks, embeddings)
+    stored = store.get("https://a.com/1", MODEL, DIMENSIONS)
+    assert stored["text"] == text
+    assert stored["chunks"] == chunks
+    assert np.array_equal(stored["embeddings"], embeddings)
+    assert store.get("https://a.com/1", MODEL, 16) is None
+    assert store.contains("https://a.com/1", MODEL, DIMENSIONS)
+    assert store.get_text(get_url_hash("https://a.com/1")) == {"url": "https://a.com/1", "text": text, "chunks": chunks}
+    assert store.get_text(get_url_hash("https://a.com/2")) is None
+    assert not store.contains("https://a.com/2", MODEL, DIMENSIONS)
+    stats = store.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_article_store_quantized_embeddings(tmp_path):
+    store = ArticleStore(str(tmp_path / "article.sqlite3"), storage_mode="int8")
+    embeddings = np.random.rand(3, DIMENSIONS).astype(np.float32)
+    store.put("https://a.com/1", MODEL, DIMENSIONS, "a b c", ["a", "b", "c"], embeddings)
+    stored = store.get("https://a.com/1", MODEL, DIMENSIONS)
+    assert stored["embeddings"].shape == (3, DIMENSIONS)
+    assert np.allclose(stored["embeddings"], embeddings, atol=0.01)
+
+
+def test_article_store_expires(tmp_path):
+    store = ArticleStore(str(tmp_path / "article.sqlite3"), ttl_seconds=0.05)
+    store.put("https://a.com/1", MODEL, DIMENSIONS, "a", ["a"], np.ones((1, DIMENSIONS)))
+    time.sleep(0.06)
+    assert not store.contains("https://a.com/1", MODEL, DIMENSIONS)
+    assert store.get("https://a.com/1", MODEL, DIMENSIONS) is None
+    assert store.get_stats()["expired"] == 1
+
+
+def test_article_store_evicts_least_recently_used(tmp_path):
+    store = ArticleStore(str(tmp_path / "article.sqlite3"), max_entries=2)
+    for i in range(2):
+        store.put(f"https://a.com/{i}", MODEL, DIMENSIONS, "a", ["a"], np.ones((1, DIMENSIONS)))
+    time.sleep(0.01)
+    store.get("https://a.com/0", MODEL, DIMENSIONS)
+    store.put("https://a.com/2", MODEL, DIMENSIONS, "a", ["a"], np.ones((1, DIMENSIONS)))
+    assert store.get("https://a.com/0", MODEL, DIMENSIONS) is not None
+    assert store.get("https://a.com/1", MODEL, DIMENSIONS) is None
+    assert store.get_stats()["evictions"] == 1
+
+
+def test_article_store_drops_rows_from_older_schema(tmp_path):
+    path = str(tmp_path / "article.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE article (url_hash TEXT PRIMARY KEY, uploaded_news_url TEXT NOT NULL)")
+    conn.execute("INSERT INTO article VALUES ('hash', 'https://gcs/1.html')")
+    conn.commit()
+    conn.close()
+    store = ArticleStore(path)
+    assert store.get_stats()["entries"] == 0
+    assert store.put("https://a.com/1", MODEL, DIMENSIONS, "a", ["a"], np.ones((1, DIMENSIONS)))
+
+
+def test_simhash_near_duplicates():
+    republished = "[연합인포맥스] " + ARTICLE + " 무단전재 금지."
+    unrelated = "반도체 수출이 석 달 연속 증가하며 무역수지 흑자 폭이 확대됐다. 메모리 가격 반등이 실적 개선을 이끌었다."
+    assert get_simhash(ARTICLE) == get_simhash(" ".join(ARTICLE.split()))
+    assert get_hamming_distance(get_simhash(ARTICLE), get_simhash(republished)) <= 6
+    assert get_hamming_distance(get_simhash(ARTICLE), get_simhash(unrelated)) > 6
+
+
+def test_simhash_index_keeps_first_copy():
+    dedupe_index = SimHashIndex()
+    assert dedupe_index.find_or_add("https://a.com/1", ARTICLE) is None
+    assert dedupe_index.find_or_add("https://b.com/1", ARTICLE + " 끝.") == "https://a.com/1"
+    assert dedupe_index.find_or_add("https://c.com/1", "전혀 다른 기사 본문입니다. 환율이 급등했다.") is None
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from utils.cache_util import TTLCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Nvidia   Earnings\n") == "nvidia earnings"
+
+
+def test_ttl_cache_hits_until_expired():
+    cache = TTLCache(ttl_seconds=0.05)
+    calls = []
+    assert cache.get_or_create("key", lambda: calls.append(1) or len(calls)) == 1
+    assert cache.get_or_create("key", lambda: calls.append(1) or len(calls)) == 1
+    time.sleep(0.06)
+    assert cache.get_or_create("key", lambda: calls.append(1) or len(calls)) == 2
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["expired"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.get_or_create("a", lambda: "a")
+    cache.get_or_create("b", lambda: "b")
+    cache.get_or_create("a", lambda: "unused")
+    cache.get_or_create("c", lambda: "c")
+    assert cache.get_or_create("a", lambda: "reloaded") == "a"
+    assert cache.get_or_create("b", lambda: "reloaded") == "reloaded"
+    assert cache.get_stats()["evictions"] == 2
+
+
+def test_ttl_cache_singleflight():
+    cache = TTLCache()
+    calls = []
+    started = threading.Event()
+
+    def slow_request():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"items": []}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("key", slow_request)))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"items": []}] * 8
+    stats = cache.get_stats()
+    assert stats["coalesced"] == 7
+    assert stats["hit_rate"] == 7 / 8
+
+
+def test_ttl_cache_does_not_cache_errors():
+    cache = TTLCache()
+
+    def failing_request():
+        raise ValueError("quota exceeded")
+
+    with pytest.raises(ValueError):
+        cache.get_or_create("key", failing_request)
+    assert cache.get_or_create("key", lambda: "ok") == "ok"
+    assert cache.get_stats()["entries"] == 1
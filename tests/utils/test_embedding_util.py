@@ -0,0 +1,294 @@
+import base64
+import json
+import sqlite3
+import threading
+import time
+from typing import List
+
+import numpy as np
+import pytest
+
+from utils import embedding_util
+from utils.embedding_util import (
+    EmbeddingCache,
+    EmbeddingMicroBatcher,
+    QuantizedEmbeddings,
+    batched_get_embedding,
+    decode_base64_embeddings,
+    decode_embedding,
+    encode_embedding,
+    pack_by_tokens,
+    top_k_similarity,
+)
+
+
+@pytest.fixture(scope="session")
+def kor_query_embedding() -> List[float]:
+    with open("tests/services/data/kor_query_embedding.json") as fr:
+        query_embedding = json.loads(fr.read())
+        return query_embedding
+
+
+@pytest.fixture(scope="session")
+def eng_query_embedding() -> List[float]:
+    with open("tests/services/data/eng_query_embedding.json") as fr:
+        query_embedding = json.loads(fr.read())
+        return query_embedding
+
+
+class FakeEmbedding:
+    def __init__(self, delay: float = 0.0):
+        self.requested: List[List[str]] = []
+        self.delay = delay
+
+    def __call__(self, text_list: List[str]) -> List[List[float]]:
+        self.requested.append(text_list)
+        time.sleep(self.delay)
+        return [[float(len(text)), 1.0, -1.0] for text in text_list]
+
+
+@pytest.fixture
+def embedding_cache(tmp_path) -> EmbeddingCache:
+    return EmbeddingCache(str(tmp_path / "embedding_cache.sqlite3"), max_entries=3)
+
+
+def test_embedding_cache_hit(embedding_cache: EmbeddingCache):
+    fake_embedding = FakeEmbedding()
+    first = embedding_cache.get_or_create("model", 3, ["a", "bb"], fake_embedding)
+    second = embedding_cache.get_or_create("model", 3, ["bb", "a", "ccc"], fake_embedding)
+    assert first.tolist() == [[1.0, 1.0, -1.0], [2.0, 1.0, -1.0]]
+    assert second.tolist() == [[2.0, 1.0, -1.0], [1.0, 1.0, -1.0], [3.0, 1.0, -1.0]]
+    assert fake_embedding.requested == [["a", "bb"], ["ccc"]]
+    stats = embedding_cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+
+
+def test_embedding_cache_counts_repeated_text_once(embedding_cache: EmbeddingCache):
+    fake_embedding = FakeEmbedding()
+    result = embedding_cache.get_or_create("model", 3, ["a", "a", "a"], fake_embedding)
+    assert result.tolist() == [[1.0, 1.0, -1.0]] * 3
+    assert fake_embedding.requested == [["a"]]
+    stats = embedding_cache.get_stats()
+    assert stats["hits"] == 0
+    assert stats["misses"] == 1
+    embedding_cache.get_or_create("model", 3, ["a", "b", "b"], fake_embedding)
+    stats = embedding_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_embedding_cache_key_includes_model(embedding_cache: EmbeddingCache):
+    fake_embedding = FakeEmbedding()
+    embedding_cache.get_or_create("model", 3, ["a"], fake_embedding)
+    embedding_cache.get_or_create("other-model", 3, ["a"], fake_embedding)
+    embedding_cache.get_or_create("model", 256, ["a"], fake_embedding)
+    assert len(fake_embedding.requested) == 3
+
+
+def test_embedding_cache_lru_eviction(embedding_cache: EmbeddingCache):
+    fake_embedding = FakeEmbedding()
+    embedding_cache.get_or_create("model", 3, ["a", "b", "c"], fake_embedding)
+    embedding_cache.get_or_create("model", 3, ["a"], fake_embedding)
+    embedding_cache.get_or_create("model", 3, ["d"], fake_embedding)
+    assert embedding_cache.get_stats()["entries"] == 3
+    embedding_cache.get_or_create("model", 3, ["a", "d"], fake_embedding)
+    assert fake_embedding.requested == [["a", "b", "c"], ["d"]]
+    assert embedding_cache.get_stats()["evictions"] == 1
+
+
+def test_pack_by_tokens(monkeypatch):
+    monkeypatch.setattr(embedding_util, "tokenizer", None)
+    text_list = ["a" * 4, "b" * 4, "c" * 10, "d", "e"]
+    assert pack_by_tokens(text_list, max_tokens=8) == [[0, 1], [2], [3, 4]]
+    assert pack_by_tokens(text_list, max_tokens=100, max_inputs=2) == [[0, 1], [2, 3], [4]]
+
+
+def test_batched_get_embedding_keeps_order(monkeypatch):
+    monkeypatch.setattr(embedding_util, "tokenizer", None)
+    fake_embedding = FakeEmbedding()
+    text_list = ["a" * (i % 7 + 1) for i in range(30)]
+    result = batched_get_embedding(text_list, fake_embedding, max_tokens=10, max_workers=3)
+    assert result.tolist() == [[float(len(text)), 1.0, -1.0] for text in text_list]
+    assert len(fake_embedding.requested) > 1
+
+
+def test_micro_batcher_merges_concurrent_requests():
+    fake_embedding = FakeEmbedding(delay=0.05)
+    batcher = EmbeddingMicroBatcher(fake_embedding, window_ms=50, max_batch_size=64)
+    results = {}
+
+    def embed(i: int):
+        results[i] = batcher.embed([f"text {i}", "shared"]).tolist()
+
+    threads = [threading.Thread(target=embed, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(10):
+        assert results[i] == [[float(len(f"text {i}")), 1.0, -1.0], [6.0, 1.0, -1.0]]
+    requested_texts = [text for texts in fake_embedding.requested for text in texts]
+    assert len(fake_embedding.requested) < 10
+    assert requested_texts.count("shared") == 1
+    stats = batcher.get_stats()
+    assert stats["coalesced"] == 9
+    assert 0 < stats["fill_ratio"] <= 1
+
+
+def test_micro_batcher_respects_max_batch_size():
+    fake_embedding = FakeEmbedding()
+    batcher = EmbeddingMicroBatcher(fake_embedding, window_ms=10, max_batch_size=4)
+    text_list = [str(i) for i in range(10)]
+    assert batcher.embed(text_list).tolist() == [[float(len(x)), 1.0, -1.0] for x in text_list]
+    assert all(len(x) <= 4 for x in fake_embedding.requested)
+
+
+def test_micro_batcher_propagates_errors():
+    def failing_embedding(text_list: List[str]) -> List[List[float]]:
+        raise RuntimeError("embedding api failed")
+
+    batcher = EmbeddingMicroBatcher(failing_embedding, window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.embed(["a"])
+
+
+def test_micro_batcher_hands_out_views():
+    response = np.arange(12, dtype=np.float32).reshape(4, 3)
+    batcher = EmbeddingMicroBatcher(lambda text_list: response[:len(text_list)], window_ms=1)
+    embeddings = batcher.embed(["a", "b", "c"])
+    assert np.shares_memory(embeddings, response)
+    assert embeddings.tolist() == response[:3].tolist()
+    assert not embeddings.flags.writeable
+
+
+def test_embedding_cache_returns_response_on_full_miss(embedding_cache: EmbeddingCache):
+    response = np.ones((2, 3), dtype=np.float32)
+    assert embedding_cache.get_or_create("model", 3, ["a", "b"], lambda x: response) is response
+    mixed = embedding_cache.get_or_create("model", 3, ["a", "c"], lambda x: np.zeros((1, 3), dtype=np.float32))
+    assert mixed.tolist() == [[1.0, 1.0, 1.0], [0.0, 0.0, 0.0]]
+
+
+def test_micro_batcher_fails_every_caller_on_short_response():
+    def short_embedding(text_list: List[str]) -> List[List[float]]:
+        return [[1.0, 0.0, 0.0]] * (len(text_list) - 1)
+
+    batcher = EmbeddingMicroBatcher(short_embedding, window_ms=20)
+    errors = []
+
+    def embed(text: str):
+        try:
+            batcher.embed([text])
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=embed, args=(str(i),)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(errors) == 3
+
+
+def test_decode_base64_embeddings():
+    expected = np.random.default_rng(0).standard_normal((3, 8)).astype(np.float32)
+    encoded_list = [base64.b64encode(x.astype("<f4").tobytes()).decode() for x in expected]
+    embeddings = decode_base64_embeddings(encoded_list, 8)
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(embeddings, expected)
+
+
+@pytest.mark.parametrize("storage_mode,size,atol", [
+    ("float32", 4096, 0),
+    ("float16", 2048, 1e-3),
+    ("int8", 1028, 1e-3),
+])
+def test_encode_decode_embedding(storage_mode: str, size: int, atol: float,
+                                 kor_query_embedding: List[float]):
+    embedding = np.asarray(kor_query_embedding, dtype=np.float32)
+    blob = encode_embedding(embedding, storage_mode)
+    assert len(blob) == size
+    np.testing.assert_allclose(decode_embedding(blob, 1024, storage_mode), embedding, atol=atol)
+
+
+def test_decode_embedding_uses_stored_mode():
+    # at 4 dimensions a float16 blob and an int8 blob are both 8 bytes
+    embedding = np.asarray([0.5, -0.25, 0.125, 1.0], dtype=np.float32)
+    float16_blob = encode_embedding(embedding, "float16")
+    int8_blob = encode_embedding(embedding, "int8")
+    assert len(float16_blob) == len(int8_blob)
+    np.testing.assert_allclose(decode_embedding(float16_blob, 4, "float16"), embedding, atol=1e-3)
+    np.testing.assert_allclose(decode_embedding(int8_blob, 4, "int8"), embedding, atol=1e-2)
+    with pytest.raises(ValueError):
+        decode_embedding(float16_blob, 4, "float32")
+
+
+@pytest.mark.parametrize("storage_mode", ["float16", "int8"])
+def test_embedding_cache_miss_matches_hit(tmp_path, storage_mode: str, kor_query_embedding: List[float]):
+    embedding_cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), storage_mode=storage_mode)
+    embedding = np.asarray([kor_query_embedding], dtype=np.float32)
+    missed = embedding_cache.get_or_create("model", 1024, ["question"], lambda x: embedding)
+    hit = embedding_cache.get_or_create("model", 1024, ["question"], None)
+    np.testing.assert_array_equal(missed, hit)
+
+
+def test_embedding_cache_drops_rows_without_mode(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE embedding (model TEXT, dimensions INTEGER, text_hash TEXT, vector BLOB, "
+                 "accessed_at REAL, PRIMARY KEY (model, dimensions, text_hash))")
+    conn.commit()
+    conn.close()
+    embedding_cache = EmbeddingCache(path)
+    fake_embedding = FakeEmbedding()
+    embedding_cache.get_or_create("model", 3, ["a"], fake_embedding)
+    assert embedding_cache.get_or_create("model", 3, ["a"], fake_embedding).tolist() == [[1.0, 1.0, -1.0]]
+    assert fake_embedding.requested == [["a"]]
+
+
+def test_embedding_cache_storage_mode(tmp_path, kor_query_embedding: List[float]):
+    embedding_cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), storage_mode="int8")
+    embedding = np.asarray([kor_query_embedding], dtype=np.float32)
+    embedding_cache.get_or_create("model", 1024, ["question"], lambda x: embedding)
+    cached = embedding_cache.get_or_create("model", 1024, ["question"], None)
+    assert float(cached[0].dot(embedding[0])) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_quantized_embeddings_prefix_search(kor_query_embedding: List[float],
+                                            eng_query_embedding: List[float]):
+    rng = np.random.default_rng(0)
+    queries = np.asarray([kor_query_embedding, eng_query_embedding], dtype=np.float32)
+    corpus = rng.standard_normal((200, 1024)).astype(np.float32)
+    corpus[:2] += queries * 40
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    quantized = QuantizedEmbeddings(corpus, storage_mode="int8", prefix_dimensions=256)
+    scores, indices = quantized.search(queries[0], top_k=2, num_candidates=20)
+    assert indices.tolist() == [0, 1]
+    assert scores[0] == pytest.approx(float(corpus[0].dot(queries[0])), abs=1e-2)
+    assert quantized.nbytes < corpus.nbytes / 2
+    # both questions in one pass, one row per question
+    scores, indices = quantized.search(queries, top_k=1, num_candidates=20)
+    assert indices.tolist() == [[0], [1]]
+    assert scores[1][0] == pytest.approx(float(corpus[1].dot(queries[1])), abs=1e-2)
+
+
+def test_top_k_similarity(kor_query_embedding: List[float], eng_query_embedding: List[float]):
+    rng = np.random.default_rng(0)
+    queries = np.asarray([kor_query_embedding, eng_query_embedding], dtype=np.float32)
+    chunks = rng.standard_normal((6, 1024)).astype(np.float32) * 0.01
+    chunks[1] += queries[0]
+    chunks[4] += queries[1]
+    scores, indices = top_k_similarity(queries, chunks, top_k=2)
+    assert indices.shape == (2, 2)
+    assert indices[:, 0].tolist() == [1, 4]
+    np.testing.assert_allclose(scores, np.take_along_axis(queries.dot(chunks.T), indices, axis=1))
+    assert (scores[:, 0] >= scores[:, 1]).all()
+
+
+def test_top_k_similarity_single_query_and_small_input():
+    scores, indices = top_k_similarity([1.0, 0.0], [[0.2, 0.0], [0.9, 0.0]], top_k=5)
+    assert indices.tolist() == [[1, 0]]
+    np.testing.assert_allclose(scores, [[0.9, 0.2]])
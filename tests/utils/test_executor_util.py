@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from utils.executor_util import BoundedExecutor, get_executor, get_executor_stats
+
+
+def test_get_executor_is_shared():
+    assert get_executor("io-crawl") is get_executor("io-crawl")
+    assert get_executor("io-crawl") is not get_executor("parse")
+    assert "io-crawl" in get_executor_stats()
+
+
+def test_get_executor_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        get_executor("unknown")
+
+
+def test_get_executor_reads_size_from_env(monkeypatch):
+    import utils.executor_util as executor_util
+
+    monkeypatch.setattr(executor_util, "executors", {})
+    monkeypatch.setenv("EXECUTOR_EMBEDDING_REQUEST_WORKERS", "2")
+    executor = get_executor("embedding-request")
+    assert executor.get_stats()["max_workers"] == 2
+    executor.shutdown()
+
+
+def test_bounded_executor_reports_queue_and_wait():
+    executor = BoundedExecutor("test", max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    running = executor.submit(block)
+    started.wait()
+    queued = [executor.submit(lambda i=i: i) for i in range(3)]
+    stats = executor.get_stats()
+    assert stats["active"] == 1
+    assert stats["queue_depth"] == 3
+    queued[-1].cancel()
+    assert executor.get_stats()["queue_depth"] == 2
+    release.set()
+    running.result()
+    assert [x.result() for x in queued[:-1]] == [0, 1]
+    stats = executor.get_stats()
+    assert stats["queue_depth"] == 0
+    assert stats["active"] == 0
+    assert stats["completed"] == 3
+    assert stats["max_wait_ms"] > 0
+    executor.shutdown()
+
+
+def test_bounded_executor_map_keeps_order():
+    executor = BoundedExecutor("test", max_workers=4)
+    assert list(executor.map(lambda x: x * 2, range(8))) == list(range(0, 16, 2))
+    executor.shutdown()
@@ -0,0 +1,33 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from utils.extract_util import ArticleExtractor
+
+
+@pytest.mark.parametrize("filename, tag, attribute, value", [
+    ("article_einfomax.html", "article", "id", "article-view-content-div"),
+    ("article_hankyung.html", "div", "id", "articletxt"),
+    ("article_mk.html", "div", "itemprop", "articleBody"),
+    ("article_bp.html", "div", "class", "detail_editor"),
+    ("article_yf.html", "div", "class", "caas-body"),
+    ("article_investing.html", "div", "class", "WYSIWYG"),
+])
+def test_extractor_matches_soup(filename: str, tag: str, attribute: str, value: str):
+    with open(f"tests/services/data/{filename}") as fr:
+        article_html = fr.read()
+    article_soup = BeautifulSoup(article_html, "lxml").find(tag, attrs={attribute: value})
+    assert ArticleExtractor(tag, attribute, value).extract(article_html) == article_soup.text
+
+
+def test_extractor_returns_outer_target():
+    article_html = '<div class="body main">out<div class="body">in</div>tail</div><div class="body">next</div>'
+    assert ArticleExtractor("div", "class", "body").extract(article_html) == "outintail"
+
+
+def test_extractor_skips_scripts_and_collapses_whitespace():
+    article_html = '<div id="a">one<script>var x;</script>\n\t\t<!-- ad --><b>two</b>  <pre>  three  </pre></div>'
+    assert ArticleExtractor("div", "id", "a").extract(article_html) == "one\ntwo   three  "
+
+
+def test_extractor_missing_target():
+    assert ArticleExtractor("div", "id", "articletxt").extract("<html><body><p>empty</p></body></html>") is None
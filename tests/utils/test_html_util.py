@@ -0,0 +1,31 @@
+import pytest
+
+from utils.article_util import get_url_hash
+from utils.html_util import (get_news_reference_page_link, get_reference_page_html, get_report_reference_page_link,
+                             get_saved_news_reference_page_link)
+
+
+def test_get_reference_page_html_escapes_paragraph():
+    reference_page_html = get_reference_page_html(
+        origin_url="https://storage.googleapis.com/reference_page/news/a.html",
+        reference_url="https://news.einfomax.co.kr/news/1?a=1&b=\"2\"",
+        related_paragraph="<script>alert(1)</script> 금리 & 환율",
+    )
+    assert "<script>" not in reference_page_html
+    assert "&lt;script&gt;alert(1)&lt;/script&gt; 금리 &amp; 환율" in reference_page_html
+    assert "b=&quot;2&quot;" in reference_page_html
+
+
+@pytest.mark.parametrize("url", ["javascript:alert(1)", "data:text/html,<p>", "file:///etc/passwd"])
+def test_get_reference_page_html_rejects_non_http_url(url: str):
+    with pytest.raises(ValueError):
+        get_reference_page_html(origin_url=url, reference_url=None, related_paragraph="")
+    with pytest.raises(ValueError):
+        get_reference_page_html(origin_url="https://a.com", reference_url=url, related_paragraph="")
+
+
+def test_reference_page_links_carry_keys_only():
+    url = "https://news.einfomax.co.kr/news/articleView.html?idxno=1"
+    assert get_news_reference_page_link(url, 3) == f"reference?news={get_url_hash(url)}&chunk=3"
+    assert get_report_reference_page_link("fnguide", "r1_0") == "reference?namespace=fnguide&report=r1_0"
+    assert get_saved_news_reference_page_link(12, 1) == "reference?question=12&news_index=1"
@@ -0,0 +1,75 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.http_util import HttpClient
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with ArticleHandler.lock:
+            ArticleHandler.active += 1
+            ArticleHandler.max_active = max(ArticleHandler.max_active, ArticleHandler.active)
+        if self.path == "/slow":
+            time.sleep(0.05)
+        body = f"<html>{self.path}</html>".encode()
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with ArticleHandler.lock:
+            ArticleHandler.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    ArticleHandler.max_active = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArticleHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_client_reuses_connections(server_url: str):
+    http_client = HttpClient()
+    for i in range(5):
+        response = http_client.get(f"{server_url}/article/{i}")
+        assert response.text == f"<html>/article/{i}</html>"
+        assert response.headers["Content-Encoding"] == "gzip"
+    stats = http_client.get_pool_stats()["127.0.0.1"]
+    assert stats["connections"] == 1
+    assert stats["reused"] == 4
+    assert stats["client_requests"] == 5
+
+
+def test_http_client_limits_concurrency_per_host(server_url: str):
+    http_client = HttpClient(max_per_host=2)
+    threads = [
+        threading.Thread(target=http_client.get, args=(f"{server_url}/slow",))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert ArticleHandler.max_active <= 2
+    assert http_client.get_pool_stats()["127.0.0.1"]["client_requests"] == 6
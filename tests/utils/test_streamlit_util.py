@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+import utils.streamlit_util as streamlit_util
+from utils.streamlit_util import run_parallel_with_progress
+
+
+class FakeProgressBar:
+    def __init__(self):
+        self.values = []
+        self.emptied = False
+
+    def progress(self, value: float, text: str = ""):
+        self.values.append(value)
+
+    def empty(self):
+        self.emptied = True
+
+
+@pytest.fixture
+def progress_bar(monkeypatch) -> FakeProgressBar:
+    progress_bar = FakeProgressBar()
+
+    def progress(value: float, text: str = "") -> FakeProgressBar:
+        progress_bar.progress(value, text)
+        return progress_bar
+
+    monkeypatch.setattr(streamlit_util.st, "progress", progress, raising=False)
+    return progress_bar
+
+
+def sleep_then_return(seconds: float, value: str) -> str:
+    time.sleep(seconds)
+    return value
+
+
+def fail(message: str):
+    raise ValueError(message)
+
+
+def test_run_parallel_with_progress_keeps_task_order(progress_bar: FakeProgressBar):
+    # the first task finishes last
+    task_list = [(sleep_then_return, (0.2, "a")), (sleep_then_return, (0.1, "b")), (sleep_then_return, (0.0, "c"))]
+    start = time.perf_counter()
+    assert run_parallel_with_progress("검색 중...", task_list) == ["a", "b", "c"]
+    assert time.perf_counter() - start < 0.3
+    assert progress_bar.values == [0.0, 1 / 3, 2 / 3, 1.0]
+    assert progress_bar.emptied
+
+
+def test_run_parallel_with_progress_keeps_results_of_other_tasks(progress_bar: FakeProgressBar):
+    task_list = [(sleep_then_return, (0.0, "a")), (fail, ("target down",)), (sleep_then_return, (0.0, "c"))]
+    assert run_parallel_with_progress("검색 중...", task_list) == ["a", None, "c"]
+    assert progress_bar.values[-1] == 1.0
+
+
+def test_run_parallel_with_progress_without_tasks(progress_bar: FakeProgressBar):
+    assert run_parallel_with_progress("검색 중...", []) == []
+    assert progress_bar.values == []
@@ -0,0 +1,124 @@
+import concurrent.futures
+import gzip
+import threading
+
+import pytest
+
+from utils.upload_util import LocalBucket, UploadManifest, UploadService
+
+PUBLIC_URL = "https://storage.googleapis.com/reference_page"
+HTML = "<html><body>" + "기준금리 동결 " * 200 + "</body></html>"
+
+
+class FailingBucket(LocalBucket):
+    def blob(self, name: str):
+        blob = super().blob(name)
+
+        def upload_from_string(data: bytes, content_type: str = "text/plain"):
+            raise ConnectionError("bucket unavailable")
+
+        blob.upload_from_string = upload_from_string
+        return blob
+
+
+@pytest.fixture
+def executor():
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+    yield executor
+    executor.shutdown()
+
+
+def read_blob(bucket: LocalBucket, public_url: str) -> str:
+    with open(f"{bucket.root}/{public_url[len(PUBLIC_URL) + 1:]}", "rb") as fr:
+        return gzip.decompress(fr.read()).decode("utf-8")
+
+
+def test_upload_gzips_with_content_encoding(tmp_path, executor):
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    service = UploadService(bucket, UploadManifest(str(tmp_path / "manifest.sqlite3")), PUBLIC_URL, executor)
+    public_url = service.upload("news", HTML)
+    assert public_url.startswith(f"{PUBLIC_URL}/news/")
+    assert read_blob(bucket, public_url) == HTML
+    metadata = bucket.metadata[public_url[len(PUBLIC_URL) + 1:]]
+    assert metadata["content_encoding"] == "gzip"
+    assert metadata["content_type"].startswith("text/html")
+    stats = service.get_stats()
+    assert stats["uploaded"] == 1
+    assert stats["uploaded_bytes"] < stats["raw_bytes"]
+
+
+def test_upload_skips_content_in_manifest(tmp_path, executor):
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    manifest_path = str(tmp_path / "manifest.sqlite3")
+    service = UploadService(bucket, UploadManifest(manifest_path), PUBLIC_URL, executor)
+    public_url = service.upload("news", HTML)
+    assert service.upload("news", HTML) == public_url
+    assert service.upload("news", HTML + " ") != public_url
+    # a new process reads the same manifest
+    restarted = UploadService(bucket, UploadManifest(manifest_path), PUBLIC_URL, executor)
+    assert restarted.upload("news", HTML) == public_url
+    assert service.get_stats()["uploaded"] == 2
+    assert service.get_stats()["skipped"] == 1
+    assert restarted.get_stats()["uploaded"] == 0
+
+
+def test_upload_many_sends_concurrently(tmp_path, executor):
+    barrier = threading.Barrier(3, timeout=5)
+
+    class BarrierBucket(LocalBucket):
+        def blob(self, name: str):
+            blob = super().blob(name)
+            upload_from_string = blob.upload_from_string
+
+            def wait_then_upload(data: bytes, content_type: str = "text/plain"):
+                # only passes once all three uploads are in flight together
+                barrier.wait()
+                upload_from_string(data, content_type)
+
+            blob.upload_from_string = wait_then_upload
+            return blob
+
+    bucket = BarrierBucket(str(tmp_path / "bucket"))
+    service = UploadService(bucket, UploadManifest(str(tmp_path / "manifest.sqlite3")), PUBLIC_URL, executor)
+    html_list = [f"<p>{i}</p>" for i in range(3)]
+    public_urls = service.upload_many("reference_page", html_list)
+    assert [read_blob(bucket, x) for x in public_urls] == html_list
+
+
+def test_submit_is_write_behind(tmp_path, executor):
+    release = threading.Event()
+
+    class SlowBucket(LocalBucket):
+        def blob(self, name: str):
+            blob = super().blob(name)
+            upload_from_string = blob.upload_from_string
+
+            def slow_upload(data: bytes, content_type: str = "text/plain"):
+                release.wait(5)
+                upload_from_string(data, content_type)
+
+            blob.upload_from_string = slow_upload
+            return blob
+
+    bucket = SlowBucket(str(tmp_path / "bucket"))
+    service = UploadService(bucket, UploadManifest(str(tmp_path / "manifest.sqlite3")), PUBLIC_URL, executor)
+    public_url, future = service.submit("news", HTML)
+    # the same page asked for again while it is being sent shares the upload
+    assert service.submit("news", HTML) == (public_url, future)
+    assert not future.done()
+    assert service.get_stats()["pending"] == 1
+    release.set()
+    service.flush()
+    assert read_blob(bucket, public_url) == HTML
+    assert service.get_stats()["pending"] == 0
+
+
+def test_failed_upload_is_not_recorded(tmp_path, executor):
+    manifest = UploadManifest(str(tmp_path / "manifest.sqlite3"))
+    service = UploadService(FailingBucket(str(tmp_path / "bucket")), manifest, PUBLIC_URL, executor)
+    with pytest.raises(ConnectionError):
+        service.upload("news", HTML)
+    assert service.get_stats()["failed"] == 1
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    retried = UploadService(bucket, manifest, PUBLIC_URL, executor)
+    assert read_blob(bucket, retried.upload("news", HTML)) == HTML
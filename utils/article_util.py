@@ -0,0 +1,328 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from hashlib import md5
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from utils.embedding_util import (
+    EMBEDDING_STORAGE_MODES,
+    decode_embedding,
+    encode_embedding,
+)
+
+
+def get_url_hash(url: str) -> str:
+    return md5(url.encode()).hexdigest()
+
+
+def get_simhash(text: str, shingle_size: int = 4) -> int:
+    # character shingles, so korean text without reliable word boundaries hashes the same way
+    normalized = "".join(text.lower().split())
+    shingles = {normalized[i:i + shingle_size] for i in range(max(len(normalized) - shingle_size + 1, 1))}
+    digests = b"".join(md5(shingle.encode()).digest()[:8] for shingle in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(-1, 64)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+
+def get_hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        self.fingerprints: List[Tuple[int, str]] = []
+        self.lock = threading.Lock()
+
+    def find_or_add(self, key: str, text: str) -> Optional[str]:
+        simhash = get_simhash(text)
+        with self.lock:
+            for fingerprint, fingerprint_key in self.fingerprints:
+                if get_hamming_distance(simhash, fingerprint) <= self.max_distance:
+                    return fingerprint_key
+            self.fingerprints.append((simhash, key))
+        return None
+
+
+def get_chunk_offsets(text: str, chunks: List[str]) -> Optional[List[Tuple[int, int]]]:
+    # chunks overlap, so each one is searched for after the start of the previous one
+    offsets = []
+    start = 0
+    for chunk in chunks:
+        idx = text.find(chunk, start)
+        if idx == -1:
+            return None
+        offsets.append((idx, idx + len(chunk)))
+        start = idx + 1
+    return offsets
+
+
+class ArticleStore:
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        storage_mode: str = "float32",
+    ):
+        if storage_mode not in EMBEDDING_STORAGE_MODES:
+            raise ValueError(f"Invalid storage mode: {storage_mode}")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.storage_mode = storage_mode
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(article)")]
+        if columns and "storage_mode" not in columns:
+            # rows from an older schema: an uploaded page url per row and no stored embedding mode
+            self.conn.execute("DROP TABLE article")
+        self.conn.execute(
+            """
+CREATE TABLE IF NOT EXISTS article (
+    url_hash TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    storage_mode TEXT NOT NULL,
+    text TEXT NOT NULL,
+    chunk_offsets TEXT NOT NULL,
+    embeddings BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS article_accessed_at ON article (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get_text(self, url_hash: str) -> Optional[dict]:
+        # read back by key for the reference page, which needs the text and not the embeddings
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, text, chunk_offsets FROM article WHERE url_hash=?", (url_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, text, chunk_offsets = row
+        return {
+            "url": url,
+            "text": text,
+            "chunks": [text[start:end] for start, end in json.loads(chunk_offsets)],
+        }
+
+    def contains(self, url: str, model: str, dimensions: int) -> bool:
+        # a peek for planning, it neither counts as a hit nor refreshes the entry
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT created_at FROM article WHERE url_hash=? AND model=? AND dimensions=?",
+                (get_url_hash(url), model, dimensions),
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def get(self, url: str, model: str, dimensions: int) -> Optional[dict]:
+        url_hash = get_url_hash(url)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                """
+SELECT storage_mode, text, chunk_offsets, embeddings, created_at FROM article
+WHERE url_hash=? AND model=? AND dimensions=?
+""",
+                (url_hash, model, dimensions),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            storage_mode, text, chunk_offsets, embeddings, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self.conn.execute("DELETE FROM article WHERE url_hash=?", (url_hash,))
+                self.conn.commit()
+                self.misses += 1
+                self.expired += 1
+                return None
+            self.conn.execute(
+                "UPDATE article SET accessed_at=? WHERE url_hash=?", (now, url_hash)
+            )
+            self.conn.commit()
+            self.hits += 1
+        chunks = [text[start:end] for start, end in json.loads(chunk_offsets)]
+        vector_size = len(embeddings) // len(chunks)
+        return {
+            "url": url,
+            "text": text,
+            "chunks": chunks,
+            "embeddings": np.stack(
+                [
+                    decode_embedding(embeddings[i:i + vector_size], dimensions, storage_mode)
+                    for i in range(0, len(embeddings), vector_size)
+                ]
+            ),
+        }
+
+    def put(
+        self,
+        url: str,
+        model: str,
+        dimensions: int,
+        text: str,
+        chunks: List[str],
+        embeddings: np.ndarray,
+    ) -> bool:
+        chunk_offsets = get_chunk_offsets(text, chunks)
+        if not chunks or chunk_offsets is None:
+            print("ARTICLE NOT STORED", url)
+            return False
+        now = time.time()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        row = (
+            get_url_hash(url),
+            url,
+            model,
+            dimensions,
+            self.storage_mode,
+            text,
+            json.dumps(chunk_offsets),
+            b"".join(encode_embedding(x, self.storage_mode) for x in embeddings),
+            now,
+            now,
+        )
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO article VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._evict(now)
+            self.conn.commit()
+        return True
+
+    def _evict(self, now: float):
+        expired = self.conn.execute(
+            "DELETE FROM article WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        self.expired += expired
+        total = self.conn.execute("SELECT COUNT(*) FROM article").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow <= 0:
+            return
+        self.conn.execute(
+            """
+DELETE FROM article WHERE rowid IN (
+    SELECT rowid FROM article ORDER BY accessed_at, rowid LIMIT ?
+)
+""",
+            (overflow,),
+        )
+        self.evictions += overflow
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM article").fetchone()[0]
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+class HtmlStore:
+    def __init__(self, path: str, max_entries: int = 2000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+CREATE TABLE IF NOT EXISTS html (
+    url_hash TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    html TEXT NOT NULL,
+    body_bytes INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS html_accessed_at ON html (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[dict]:
+        url_hash = get_url_hash(url)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, html, body_bytes, fetched_at FROM html WHERE url_hash=?",
+                (url_hash,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE html SET accessed_at=? WHERE url_hash=?", (time.time(), url_hash)
+            )
+            self.conn.commit()
+        etag, last_modified, html, body_bytes, fetched_at = row
+        return {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "html": html,
+            "body_bytes": body_bytes,
+            "fetched_at": fetched_at,
+        }
+
+    def put(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        html: str,
+        body_bytes: int,
+    ):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO html VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (get_url_hash(url), url, etag, last_modified, html, body_bytes, now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COUNT(*) FROM html").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow <= 0:
+            return
+        self.conn.execute(
+            """
+DELETE FROM html WHERE rowid IN (
+    SELECT rowid FROM html ORDER BY accessed_at, rowid LIMIT ?
+)
+""",
+            (overflow,),
+        )
+        self.evictions += overflow
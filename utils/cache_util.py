@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.in_flight: Dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0, "evictions": 0}
+
+    def get_or_create(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self.entries[key]
+                self.stats["expired"] += 1
+            # singleflight: callers asking for a key that is already loading wait for that load
+            future = self.in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.in_flight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not is_leader:
+            return future.result()
+        try:
+            value = fn()
+        except BaseException as e:
+            # failures are handed to the waiters but never cached
+            with self.lock:
+                self.in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self.in_flight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        requests = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / requests if requests else 0.0
+        return stats
@@ -0,0 +1,510 @@
+import base64
+import concurrent.futures
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from hashlib import sha256
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import tiktoken
+
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    tokenizer = None
+
+EmbeddingFunction = Callable[[List[str]], Union[np.ndarray, List[List[float]]]]
+
+# openai embeddings limits: 2048 inputs and 300k tokens per request
+EMBEDDING_MAX_REQUEST_INPUTS = 2048
+EMBEDDING_MAX_REQUEST_TOKENS = 300000
+EMBEDDING_STORAGE_MODES = ("float32", "float16", "int8")
+
+
+def get_text_hash(text: str) -> str:
+    return sha256(text.encode("utf-8")).hexdigest()
+
+
+def decode_base64_embeddings(encoded_list: List[str], dimensions: int) -> np.ndarray:
+    # each row is read as a view of its decoded bytes and copied once, into the one response array
+    embeddings = np.empty((len(encoded_list), dimensions), dtype=np.float32)
+    for i, encoded in enumerate(encoded_list):
+        embeddings[i] = np.frombuffer(base64.b64decode(encoded), dtype="<f4")
+    return embeddings
+
+
+def top_k_similarity(
+    query_embeddings: np.ndarray, embeddings: np.ndarray, top_k: int = 1
+) -> Tuple[np.ndarray, np.ndarray]:
+    query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    similarities = query_embeddings.dot(embeddings.T)
+    top_k = min(top_k, similarities.shape[1])
+    if top_k < similarities.shape[1]:
+        indices = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+    else:
+        indices = np.tile(np.arange(top_k), (len(similarities), 1))
+    scores = np.take_along_axis(similarities, indices, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(scores, order, axis=1),
+        np.take_along_axis(indices, order, axis=1),
+    )
+
+
+def quantize_embeddings(
+    embeddings: np.ndarray, storage_mode: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if storage_mode == "float32":
+        return embeddings, None
+    if storage_mode == "float16":
+        return embeddings.astype(np.float16), None
+    if storage_mode == "int8":
+        scales = np.abs(embeddings).max(axis=-1, keepdims=True) / 127
+        scales[scales == 0] = 1
+        quantized = np.rint(embeddings / scales).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Invalid storage mode: {storage_mode}")
+
+
+def dequantize_embeddings(
+    quantized: np.ndarray, scales: Optional[np.ndarray] = None
+) -> np.ndarray:
+    embeddings = quantized.astype(np.float32)
+    if scales is not None:
+        embeddings *= scales
+    return embeddings
+
+
+def encode_embedding(embedding: np.ndarray, storage_mode: str = "float32") -> bytes:
+    quantized, scale = quantize_embeddings(embedding, storage_mode)
+    if scale is None:
+        return quantized.tobytes()
+    return scale.tobytes() + quantized.tobytes()
+
+
+def decode_embedding(blob: bytes, dimensions: int, storage_mode: str = "float32") -> np.ndarray:
+    # the mode is stored next to the blob, sizes alone are ambiguous (dims * 2 == dims + 4 at dims=4)
+    if storage_mode == "float32" and len(blob) == dimensions * 4:
+        return np.frombuffer(blob, dtype=np.float32)
+    if storage_mode == "float16" and len(blob) == dimensions * 2:
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+    if storage_mode == "int8" and len(blob) == dimensions + 4:
+        scale = np.frombuffer(blob[:4], dtype=np.float32)
+        return dequantize_embeddings(np.frombuffer(blob[4:], dtype=np.int8), scale)
+    raise ValueError(f"Invalid {storage_mode} embedding size: {len(blob)} bytes for {dimensions} dimensions")
+
+
+def round_embeddings(embeddings: np.ndarray, storage_mode: str) -> np.ndarray:
+    # the values a stored copy decodes to, so fresh and stored embeddings score the same
+    if storage_mode == "float32":
+        return np.asarray(embeddings, dtype=np.float32)
+    return dequantize_embeddings(*quantize_embeddings(embeddings, storage_mode))
+
+
+def truncate_embeddings(embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+    truncated = np.asarray(embeddings, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return truncated / norms
+
+
+class QuantizedEmbeddings:
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        storage_mode: str = "float16",
+        prefix_dimensions: Optional[int] = None,
+    ):
+        self.storage_mode = storage_mode
+        self.prefix_dimensions = prefix_dimensions
+        self.vectors, self.scales = quantize_embeddings(embeddings, storage_mode)
+        self.prefix_vectors = None
+        self.prefix_scales = None
+        if prefix_dimensions:
+            self.prefix_vectors, self.prefix_scales = quantize_embeddings(
+                truncate_embeddings(embeddings, prefix_dimensions), storage_mode
+            )
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.vectors, self.scales, self.prefix_vectors, self.prefix_scales]
+        return sum(x.nbytes for x in arrays if x is not None)
+
+    def score(self, query_embedding: np.ndarray) -> np.ndarray:
+        return dequantize_embeddings(self.vectors, self.scales).dot(query_embedding)
+
+    def search(
+        self, query_embedding: np.ndarray, top_k: int, num_candidates: int = 50
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # a (queries, dims) matrix is scored in one pass and returns one row per query
+        query_embeddings = np.asarray(query_embedding, dtype=np.float32)
+        is_single_query = query_embeddings.ndim == 1
+        query_embeddings = np.atleast_2d(query_embeddings)
+        if self.prefix_vectors is None or num_candidates >= len(self):
+            candidates = np.arange(len(self))
+        else:
+            prefix_queries = truncate_embeddings(query_embeddings, self.prefix_dimensions)
+            prefix_scores = dequantize_embeddings(
+                self.prefix_vectors, self.prefix_scales
+            ).dot(prefix_queries.T).max(axis=1)
+            candidates = np.argpartition(-prefix_scores, num_candidates)[:num_candidates]
+        # rescore the surviving candidates on the full-dimension vectors
+        scales = self.scales[candidates] if self.scales is not None else None
+        scores, order = top_k_similarity(
+            query_embeddings, dequantize_embeddings(self.vectors[candidates], scales), top_k
+        )
+        indices = candidates[order]
+        if is_single_query:
+            return scores[0], indices[0]
+        return scores, indices
+
+
+class EmbeddingCache:
+    def __init__(
+        self, path: str, max_entries: int = 50000, storage_mode: str = "float32"
+    ):
+        if storage_mode not in EMBEDDING_STORAGE_MODES:
+            raise ValueError(f"Invalid storage mode: {storage_mode}")
+        self.path = path
+        self.max_entries = max_entries
+        self.storage_mode = storage_mode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(embedding)")]
+        if columns and "storage_mode" not in columns:
+            # rows from before the mode was stored cannot be decoded reliably
+            self.conn.execute("DROP TABLE embedding")
+        self.conn.execute(
+            """
+CREATE TABLE IF NOT EXISTS embedding (
+    model TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    text_hash TEXT NOT NULL,
+    storage_mode TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (model, dimensions, text_hash)
+)
+"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_accessed_at ON embedding (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get_many(
+        self, model: str, dimensions: int, text_list: List[str]
+    ) -> Dict[str, np.ndarray]:
+        text_hashes = list({get_text_hash(text) for text in text_list})
+        if not text_hashes:
+            return {}
+        placeholders = ",".join("?" * len(text_hashes))
+        with self.lock:
+            rows = self.conn.execute(
+                f"""
+SELECT text_hash, storage_mode, vector FROM embedding
+WHERE model=? AND dimensions=? AND text_hash IN ({placeholders})
+""",
+                [model, dimensions, *text_hashes],
+            ).fetchall()
+            if rows:
+                self.conn.executemany(
+                    """
+UPDATE embedding SET accessed_at=?
+WHERE model=? AND dimensions=? AND text_hash=?
+""",
+                    [(time.time(), model, dimensions, x[0]) for x in rows],
+                )
+                self.conn.commit()
+        return {
+            text_hash: decode_embedding(vector, dimensions, storage_mode)
+            for text_hash, storage_mode, vector in rows
+        }
+
+    def put_many(
+        self,
+        model: str,
+        dimensions: int,
+        text_list: List[str],
+        embeddings: np.ndarray,
+    ):
+        now = time.time()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        rows = [
+            (
+                model,
+                dimensions,
+                get_text_hash(text),
+                self.storage_mode,
+                encode_embedding(embedding, self.storage_mode),
+                now,
+            )
+            for text, embedding in zip(text_list, embeddings)
+        ]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embedding VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow <= 0:
+            return
+        self.conn.execute(
+            """
+DELETE FROM embedding WHERE rowid IN (
+    SELECT rowid FROM embedding ORDER BY accessed_at, rowid LIMIT ?
+)
+""",
+            (overflow,),
+        )
+        self.evictions += overflow
+
+    def get_or_create(
+        self,
+        model: str,
+        dimensions: int,
+        text_list: List[str],
+        embedding_function: EmbeddingFunction,
+    ) -> np.ndarray:
+        cached = self.get_many(model, dimensions, text_list)
+        # a text repeated in one request is looked up once, so it counts once
+        unique_text_list = list(dict.fromkeys(text_list))
+        missing_text_list = [
+            text for text in unique_text_list if get_text_hash(text) not in cached
+        ]
+        with self.lock:
+            self.hits += len(unique_text_list) - len(missing_text_list)
+            self.misses += len(missing_text_list)
+        if not text_list:
+            return np.empty((0, dimensions), dtype=np.float32)
+        if missing_text_list:
+            missing_embeddings = np.asarray(
+                embedding_function(missing_text_list), dtype=np.float32
+            )
+            if self.storage_mode != "float32":
+                # a later hit decodes to the rounded values, so this miss returns them too
+                missing_embeddings = round_embeddings(missing_embeddings, self.storage_mode)
+            self.put_many(model, dimensions, missing_text_list, missing_embeddings)
+            if len(missing_text_list) == len(text_list):
+                # nothing cached and nothing repeated: the response is already the result
+                return missing_embeddings
+            for text, embedding in zip(missing_text_list, missing_embeddings):
+                cached[get_text_hash(text)] = embedding
+        rows = [cached[get_text_hash(text)] for text in text_list]
+        result = np.empty((len(rows), len(rows[0])), dtype=np.float32)
+        for i, row in enumerate(rows):
+            result[i] = row
+        return result
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+            requests = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+def count_tokens(text: str) -> int:
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, disallowed_special=()))
+    # every token spans at least one utf-8 byte, so this never undercounts
+    return len(text.encode("utf-8"))
+
+
+def pack_by_tokens(
+    text_list: List[str],
+    max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+    max_inputs: int = EMBEDDING_MAX_REQUEST_INPUTS,
+) -> List[List[int]]:
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for i, text in enumerate(text_list):
+        tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_inputs):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def batched_get_embedding(
+    text_list: List[str],
+    embedding_function: EmbeddingFunction,
+    max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+    max_inputs: int = EMBEDDING_MAX_REQUEST_INPUTS,
+    max_workers: int = 4,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> np.ndarray:
+    batches = pack_by_tokens(text_list, max_tokens, max_inputs)
+    if len(batches) <= 1:
+        return np.asarray(embedding_function(text_list), dtype=np.float32)
+    batch_text_list = [[text_list[i] for i in batch] for batch in batches]
+    if executor is not None:
+        # a shared pool bounds the pages instead of max_workers
+        batch_embeddings = [
+            np.asarray(x, dtype=np.float32)
+            for x in executor.map(embedding_function, batch_text_list)
+        ]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            batch_embeddings = [
+                np.asarray(x, dtype=np.float32)
+                for x in executor.map(embedding_function, batch_text_list)
+            ]
+    result = np.empty((len(text_list), batch_embeddings[0].shape[1]), dtype=np.float32)
+    for batch, embeddings in zip(batches, batch_embeddings):
+        result[batch] = embeddings
+    return result
+
+
+class EmbeddingMicroBatcher:
+    def __init__(
+        self,
+        embedding_function: EmbeddingFunction,
+        window_ms: float = 5.0,
+        max_batch_size: int = 64,
+        max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+        max_workers: int = 4,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        self.embedding_function = embedding_function
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_tokens = max_tokens
+        self.pending: List[str] = []
+        self.in_flight: Dict[str, Future] = {}
+        self.condition = threading.Condition()
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="embedding-batch"
+        )
+        self.worker = None
+        self.requests = 0
+        self.texts = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_texts = 0
+
+    def embed(self, text_list: List[str]) -> np.ndarray:
+        if not text_list:
+            return np.empty((0, 0), dtype=np.float32)
+        futures = []
+        with self.condition:
+            self.requests += 1
+            self.texts += len(text_list)
+            for text in text_list:
+                future = self.in_flight.get(text)
+                if future is None:
+                    future = Future()
+                    self.in_flight[text] = future
+                    self.pending.append(text)
+                else:
+                    self.coalesced += 1
+                futures.append(future)
+            if self.worker is None:
+                self.worker = threading.Thread(
+                    target=self._run, name="embedding-micro-batcher", daemon=True
+                )
+                self.worker.start()
+            self.condition.notify()
+        rows = [future.result() for future in futures]
+        embeddings, start = rows[0]
+        if all(x is embeddings and i == start + k for k, (x, i) in enumerate(rows)):
+            # the whole request came back as one run of one batch, hand out a view of it
+            return embeddings[start:start + len(rows)]
+        result = np.empty((len(rows), embeddings.shape[1]), dtype=np.float32)
+        for k, (x, i) in enumerate(rows):
+            result[k] = x[i]
+        return result
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch = self._take_batch()
+                self.batches += 1
+                self.batched_texts += len(batch)
+            self.executor.submit(self._flush, batch)
+
+    def _take_batch(self) -> List[str]:
+        batch = []
+        batch_tokens = 0
+        while self.pending and len(batch) < self.max_batch_size:
+            tokens = count_tokens(self.pending[0])
+            if batch and batch_tokens + tokens > self.max_tokens:
+                break
+            batch.append(self.pending.pop(0))
+            batch_tokens += tokens
+        return batch
+
+    def _flush(self, batch: List[str]):
+        with self.condition:
+            futures = [self.in_flight[text] for text in batch]
+        try:
+            embeddings = np.asarray(self.embedding_function(batch), dtype=np.float32)
+            if len(embeddings) != len(batch):
+                # a short response would leave the unmatched callers waiting forever
+                raise ValueError(f"Expected {len(batch)} embeddings, got {len(embeddings)}")
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            # callers get views of this array, so none of them may write to it
+            embeddings.flags.writeable = False
+            for i, future in enumerate(futures):
+                future.set_result((embeddings, i))
+        finally:
+            with self.condition:
+                for text in batch:
+                    self.in_flight.pop(text, None)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.condition:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "batched_texts": self.batched_texts,
+                "fill_ratio": (
+                    self.batched_texts / (self.batches * self.max_batch_size)
+                    if self.batches
+                    else 0.0
+                ),
+            }
@@ -0,0 +1,97 @@
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+# one bounded pool per kind of work, shared by every session in the process.
+# a task only ever waits on tasks of a pool further down this list, never on its own pool
+executor_sizes = {
+    "question": 16,  # query variants raced for one question
+    "search": 32,  # one search target or one main idea's report lookup
+    "vector-query": 16,  # one pinecone namespace query, or the seeking alpha summary -> content chain
+    "article": 32,  # one search target's crawl, streaming its pages to the target's consumer
+    "io-crawl": 32,  # one page fetch
+    "parse": 16,  # one fetched page parsed and split
+    "embedding": 8,  # one token-packed page of an embedding call
+    "embedding-request": 4,  # one embeddings API request
+    "upload": 16,  # one blob sent to storage
+}
+executors: Dict[str, "BoundedExecutor"] = {}
+executors_lock = threading.Lock()
+
+
+class BoundedExecutor(concurrent.futures.Executor):
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        submitted_at = time.monotonic()
+
+        def run():
+            wait_seconds = time.monotonic() - submitted_at
+            with self.lock:
+                self.queued -= 1
+                self.active += 1
+                self.wait_seconds += wait_seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        def on_done(future: concurrent.futures.Future):
+            # a task cancelled while queued never runs, so it leaves the queue here
+            if future.cancelled():
+                with self.lock:
+                    self.queued -= 1
+
+        with self.lock:
+            self.queued += 1
+        future = self.executor.submit(run)
+        future.add_done_callback(on_done)
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "mean_wait_ms": self.wait_seconds / started * 1000 if started else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    if name not in executor_sizes:
+        raise ValueError(f"Invalid executor: {name}")
+    with executors_lock:
+        executor = executors.get(name)
+        if executor is None:
+            env_name = f"EXECUTOR_{name.upper().replace('-', '_')}_WORKERS"
+            executor = BoundedExecutor(name, int(os.environ.get(env_name, executor_sizes[name])))
+            executors[name] = executor
+        return executor
+
+
+def get_executor_stats() -> Dict[str, dict]:
+    with executors_lock:
+        return {name: executor.get_stats() for name, executor in executors.items()}
@@ -0,0 +1,75 @@
+from typing import List, Optional
+
+from lxml import etree
+
+# strings bs4 leaves out of .text: script, style and template bodies (and comments)
+skipped_text_tags = {"script", "style", "template"}
+preserve_whitespace_tags = {"pre", "textarea"}
+ascii_spaces = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+feed_size = 65536
+
+
+def _normalize_whitespace(text: str, preserve_whitespace: bool) -> str:
+    # bs4 collapses whitespace-only strings to one newline or space
+    if preserve_whitespace or text.translate(ascii_spaces):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _append_text(element, parts: List[str], preserve_whitespace: bool):
+    if not isinstance(element.tag, str) or element.tag in skipped_text_tags:
+        return
+    preserve_whitespace = preserve_whitespace or element.tag in preserve_whitespace_tags
+    if element.text:
+        parts.append(_normalize_whitespace(element.text, preserve_whitespace))
+    for child in element:
+        _append_text(child, parts, preserve_whitespace)
+        if child.tail:
+            parts.append(_normalize_whitespace(child.tail, preserve_whitespace))
+
+
+def get_element_text(element) -> str:
+    # same string BeautifulSoup's Tag.text gives for this subtree
+    if element.tag in skipped_text_tags:
+        return element.text or ""
+    parts = []
+    preserve_whitespace = any(x.tag in preserve_whitespace_tags for x in element.iterancestors())
+    _append_text(element, parts, preserve_whitespace)
+    return "".join(parts)
+
+
+class ArticleExtractor:
+    def __init__(self, tag: str, attribute: str, value: str):
+        self.tag = tag
+        if attribute == "class":
+            predicate = f"contains(concat(' ', normalize-space(@class), ' '), ' {value} ')"
+        else:
+            predicate = f"@{attribute}='{value}'"
+        # compiled once per publisher, evaluated only on closing tags of the target name
+        self.selector = etree.XPath(f"self::{tag}[{predicate}]")
+
+    def is_first_target(self, element) -> bool:
+        # a nested target closes before the outer one, which is the one bs4 find() returns
+        if not self.selector(element):
+            return False
+        return not any(self.selector(x) for x in element.iterancestors(self.tag))
+
+    def find(self, article_html: str):
+        # pull parse and stop at the first closed target, the rest of the page is never parsed
+        parser = etree.HTMLPullParser(events=("end",), tag=self.tag)
+        for i in range(0, len(article_html), feed_size):
+            parser.feed(article_html[i:i + feed_size])
+            for _, element in parser.read_events():
+                if self.is_first_target(element):
+                    return element
+        parser.close()
+        for _, element in parser.read_events():
+            if self.is_first_target(element):
+                return element
+        return None
+
+    def extract(self, article_html: str) -> Optional[str]:
+        element = self.find(article_html)
+        if element is None:
+            return None
+        return get_element_text(element)
@@ -1,4 +1,8 @@
+import html
 from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+from utils.article_util import get_url_hash
 
 html_template = """
     <!DOCTYPE html>
@@ -53,8 +57,18 @@ html_template = """
     """
 
 
+def is_http_url(url: str) -> bool:
+    return urlparse(url).scheme in ("http", "https")
+
+
 def get_reference_page_html(origin_url: str, reference_url: Optional[str], related_paragraph: str) -> str:
+    # article text and search result urls end up in markup, none of it is trusted
+    for url in [origin_url, reference_url]:
+        if url is not None and not is_http_url(url):
+            raise ValueError(f"Invalid reference page url: {url}")
+    related_paragraph = html.escape(related_paragraph)
     if reference_url is not None:
+        reference_url = html.escape(reference_url)
         text = f"""
             <h1>원문</h1>
             <a href="{reference_url}">{reference_url}</a>
@@ -67,6 +81,20 @@ def get_reference_page_html(origin_url: str, reference_url: Optional[str], relat
             <p>{related_paragraph}</p>
         """
     return html_template.format(
-        origin_url=origin_url,
+        origin_url=html.escape(origin_url),
         text=text,
     )
+
+
+def get_news_reference_page_link(url: str, chunk_index: int) -> str:
+    # the page reads the article back from the article store, so the link carries a key, not the text
+    return "reference?" + urlencode({"news": get_url_hash(url), "chunk": chunk_index})
+
+
+def get_saved_news_reference_page_link(question_id: int, news_index: int) -> str:
+    # resolved from the saved question/answer row, for answers shown again after the store has moved on
+    return "reference?" + urlencode({"question": question_id, "news_index": news_index})
+
+
+def get_report_reference_page_link(namespace: str, report_id: str) -> str:
+    return "reference?" + urlencode({"namespace": namespace, "report": report_id})
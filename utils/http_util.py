@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401 urllib3 decodes br responses when brotli is installed
+
+    accept_encoding = "gzip, deflate, br"
+except ImportError:
+    accept_encoding = "gzip, deflate"
+
+Timeout = Union[float, Tuple[float, float]]
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+class HttpClient:
+    def __init__(
+        self,
+        pool_connections: int = 32,
+        pool_maxsize: int = 8,
+        max_per_host: int = 4,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        max_retries: int = 1,
+    ):
+        # one adapter, and so one set of per-host keep-alive pools, shared by every thread
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+        )
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.host_limits: Dict[str, int] = {}
+        self.semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.requests_by_host: Dict[str, int] = defaultdict(int)
+        self.errors_by_host: Dict[str, int] = defaultdict(int)
+        self.wait_seconds_by_host: Dict[str, float] = defaultdict(float)
+
+    @property
+    def session(self) -> requests.Session:
+        # sessions carry cookies and are not thread-safe, the pools behind them are
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["Accept-Encoding"] = accept_encoding
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            self.local.session = session
+        return session
+
+    def set_host_limit(self, host: str, max_concurrency: int):
+        with self.lock:
+            self.host_limits[host] = max_concurrency
+            self.semaphores.pop(host, None)
+
+    def _get_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self.lock:
+            semaphore = self.semaphores.get(host)
+            if semaphore is None:
+                limit = self.host_limits.get(host, self.max_per_host)
+                semaphore = threading.BoundedSemaphore(limit)
+                self.semaphores[host] = semaphore
+            return semaphore
+
+    def request(
+        self, method: str, url: str, timeout: Optional[Timeout] = None, **kwargs
+    ) -> requests.Response:
+        host = urlparse(url).hostname or ""
+        semaphore = self._get_semaphore(host)
+        start = time.monotonic()
+        with semaphore:
+            wait_seconds = time.monotonic() - start
+            try:
+                response = self.session.request(
+                    method, url, timeout=timeout or self.timeout, **kwargs
+                )
+            except requests.RequestException:
+                with self.lock:
+                    self.errors_by_host[host] += 1
+                raise
+        with self.lock:
+            self.requests_by_host[host] += 1
+            self.wait_seconds_by_host[host] += wait_seconds
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_pool_stats(self) -> Dict[str, dict]:
+        stats = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats[pool.host] = {
+                "connections": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": pool.num_requests - pool.num_connections,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            }
+        with self.lock:
+            for host in set(self.requests_by_host) | set(self.errors_by_host):
+                host_stats = stats.setdefault(host, {})
+                host_stats["client_requests"] = self.requests_by_host[host]
+                host_stats["errors"] = self.errors_by_host[host]
+                host_stats["wait_seconds"] = self.wait_seconds_by_host[host]
+        return stats
+
+
+http_client = HttpClient()
@@ -1,9 +1,12 @@
+import concurrent.futures
+import time
 import webbrowser
-from typing import List, Union
+from typing import Callable, List, Tuple, Union
 
 import requests
 import streamlit as st
 
+from utils.executor_util import get_executor
 from utils.intent import (
     PRIMARY_INTENT_DICT,
     EnumPrimaryIntent,
@@ -199,7 +202,7 @@ def draw_news(news_items: List[dict], expanded: bool = True):
             st.link_button(
                 label="🗞️ 뉴스 원문 / 참고 문단 보기",
                 use_container_width=True,
-                url=news_item["reference_page_url"],
+                url=news_item.get("reference_page_url", news_item["url"]),
             )
 
 
@@ -268,3 +271,38 @@ def draw_screening_result(screening_category: str, screening_result: List[str]):
     st.markdown(f"**{screening_category}**")
     for i, result in enumerate(screening_result):
         st.write(f"{i + 1}. {result}")
+
+
+def run_parallel_with_progress(label: str, task_list: List[Tuple[Callable, tuple]]) -> list:
+    # tasks run on worker threads, only this thread touches the progress bar
+    if not task_list:
+        return []
+    progress_bar = st.progress(0.0, text=label)
+    results = [None] * len(task_list)
+    task_seconds = [0.0] * len(task_list)
+
+    def run_task(i: int, fn: Callable, args: tuple):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            task_seconds[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    executor = get_executor("search")
+    futures = {executor.submit(run_task, i, fn, args): i for i, (fn, args) in enumerate(task_list)}
+    for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+        # a failed task leaves None in its slot, the other results still come back
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            print("PARALLEL TASK FAILED", label, task_list[futures[future]][0].__name__, e)
+        progress_bar.progress(done / len(task_list), text=f"{label} ({done}/{len(task_list)})")
+    wall_seconds = time.perf_counter() - start
+    print("PARALLEL FAN OUT", label,
+          f"tasks: {len(task_list)}",
+          f"wall: {wall_seconds:.2f}s",
+          f"serial: {sum(task_seconds):.2f}s",
+          f"saved: {sum(task_seconds) - wall_seconds:.2f}s")
+    progress_bar.empty()
+    return results
@@ -1,8 +1,12 @@
+import concurrent.futures
+import threading
+import time
 from copy import deepcopy
 from datetime import datetime
+from typing import List, Optional, Tuple
 
 from services.service_db import insert_question_answer
-from services.service_google import translate, upload_html
+from services.service_google import translate
 from services.service_openai import extract_query
 from services.service_openai import get_embedding
 from services.service_openai import (
@@ -12,14 +16,11 @@ from services.service_openai import (
     generate_next_questions,
     generate_main_ideas,
 )
-from services.service_pinecone import (
-    search_fnguide,
-    search_seeking_alpha_summary,
-    search_seeking_alpha_content,
-    search_investment_bank,
-)
-from services.service_search import search_news
-from utils.html_util import get_reference_page_html
+from services.service_pinecone import search_reports
+from services.service_search import get_search_stats, search_news, stream_search_news
+from utils.article_util import SimHashIndex
+from utils.executor_util import get_executor
+from utils.html_util import get_news_reference_page_link, get_report_reference_page_link
 from utils.streamlit_util import *
 
 
@@ -27,6 +28,15 @@ set_page_config()
 write_common_style()
 write_common_session_state()
 
+# draw news cards as each article is scored instead of after every target finishes
+stream_news = True
+# opt-in: run every extracted query variant at once. "first" keeps the first variant with results,
+# "merge" pools every variant that answers within the budget, "" tries them one by one.
+# a race only has cards once a variant finishes, so it replaces stream_news: no streamed cards
+# and no per-target progress bar, just a spinner until the race ends
+race_query_mode = ""
+race_query_budget_seconds = 15.0
+
 
 def generate_prompt(instruct: str, question: str, news: List[dict]) -> str:
     news_text = ""
@@ -70,120 +80,239 @@ paragraph: {paragraph}
     return prompt.strip()
 
 
-def get_domestic_reports(
-    question_range: str, question_embedding: List[float]
+def merge_related_reports(
+    report_results: List[Tuple[str, Optional[List[dict]]]]
 ) -> List[dict]:
     domestic_report_list = []
-    if question_range == "전체" or question_range == "국내":
-        with st.spinner("국내 애널리스트 리포트 검색 중..."):
-            fnguide_report_list = search_fnguide(
-                question_embedding,
-                top_k=3,
-            )
-            domestic_report_list.extend(fnguide_report_list)
-    return domestic_report_list
-
-
-def get_oversea_reports(
-    question_range: str, question_embedding: List[float]
-) -> List[dict]:
     oversea_report_list = []
-    if question_range == "전체" or question_range == "해외":
-        with st.spinner("해외 애널리스트 리포트 검색 중..."):
-            seeking_alpha_summary_list = search_seeking_alpha_summary(
-                question_embedding, top_k=5
-            )
-            if seeking_alpha_summary_list:
-                oversea_report_ids = [
-                    x["metadata"]["id"] for x in seeking_alpha_summary_list
-                ]
-                seeking_alpha_content_list = search_seeking_alpha_content(
-                    question_embedding, oversea_report_ids, top_k=3
-                )
-                oversea_report_list.extend(seeking_alpha_content_list)
-            investment_bank_list = search_investment_bank(question_embedding, top_k=3)
-            oversea_report_list.extend(investment_bank_list)
+    for report_type, report_list in report_results:
+        if report_type == "domestic":
+            domestic_report_list.extend(report_list or [])
+        else:
+            oversea_report_list.extend(report_list or [])
     oversea_report_list = sorted(
         oversea_report_list, key=lambda x: x["score"], reverse=True
     )[:3]
-    return oversea_report_list
+    related_reports = domestic_report_list + oversea_report_list
+    related_reports = sorted(
+        related_reports, key=lambda x: x["metadata"]["published_at"], reverse=True
+    )
+    return related_reports
 
 
-def search_related_news(
+def search_related_reports(
+    question_range: str, question_embedding: List[float]
+) -> List[dict]:
+    # every namespace of one main idea is queried at once by search_reports
+    report_results = search_reports(
+        question_embedding,
+        domestic=question_range == "전체" or question_range == "국내",
+        oversea=question_range == "전체" or question_range == "해외",
+    )
+    return merge_related_reports(report_results)
+
+
+def search_all_related_reports(
+    question_range: str,
+    answer_embeddings: List[List[float]],
+) -> List[List[dict]]:
+    # every main idea in one fan-out behind one progress bar
+    return run_parallel_with_progress(
+        "애널리스트 리포트 검색 중...",
+        [(search_related_reports, (question_range, x)) for x in answer_embeddings],
+    )
+
+
+def get_news_tasks(
     question_range: str,
     kor_query: str,
     kor_question_embedding: List[float],
     eng_query: str,
     eng_question_embedding: List[float],
-) -> List[dict]:
-    related_news = []
+) -> List[Tuple[str, List[List[float]], str]]:
+    # every article is embedded once and scored against both questions in one pass,
+    # so korean and english articles rank on the same scale
+    question_embeddings = [kor_question_embedding, eng_question_embedding]
+    news_tasks = []
     if question_range == "국내" or question_range == "전체":
-        with st.spinner("국내 뉴스 검색 중..."):
-            domestic_news = search_news(
-                kor_query, kor_question_embedding, target="domestic"
-            )
-            related_news.extend(domestic_news)
+        news_tasks.append((kor_query, question_embeddings, "domestic"))
     if question_range == "해외" or question_range == "전체":
-        with st.spinner("해외 뉴스 검색 중..."):
-            yf_news = search_news(eng_query, eng_question_embedding, target="yf")
-            investing_news = search_news(
-                eng_query, eng_question_embedding, target="investing"
-            )
-            oversea_news = yf_news + investing_news
-            oversea_news = sorted(
-                oversea_news, key=lambda x: x["similarity"], reverse=True
-            )[:3]
-            related_news.extend(oversea_news)
+        news_tasks.append((eng_query, question_embeddings, "yf"))
+        news_tasks.append((eng_query, question_embeddings, "investing"))
+    return news_tasks
+
+
+def collect_related_news(
+    question_range: str,
+    kor_query: str,
+    kor_question_embedding: List[float],
+    eng_query: str,
+    eng_question_embedding: List[float],
+    cancel_event: Optional[threading.Event] = None,
+) -> List[dict]:
+    # no streamlit calls here, this also runs on the query race worker threads
+    news_tasks = get_news_tasks(
+        question_range,
+        kor_query,
+        kor_question_embedding,
+        eng_query,
+        eng_question_embedding,
+    )
+    if not news_tasks:
+        return []
+    # one index per query variant, so a story carried by several targets is embedded once
+    dedupe_index = SimHashIndex()
+    news_lists = get_executor("search").map(
+        lambda x: search_news(*x, cancel_event=cancel_event, dedupe_index=dedupe_index),
+        news_tasks,
+    )
+    related_news = [news for news_list in news_lists for news in news_list]
     related_news = sorted(related_news, key=lambda x: x["similarity"], reverse=True)[:3]
     return related_news
 
 
-def search_related_reports(
+def search_related_news(
     question_range: str,
-    answer_embedding: List[float],
+    kor_query: str,
+    kor_question_embedding: List[float],
+    eng_query: str,
+    eng_question_embedding: List[float],
 ) -> List[dict]:
-    domestic_report_list = get_domestic_reports(question_range, answer_embedding)
-    oversea_report_list = get_oversea_reports(question_range, answer_embedding)
-    related_reports = domestic_report_list + oversea_report_list
-    related_reports = sorted(
-        related_reports, key=lambda x: x["metadata"]["published_at"], reverse=True
+    news_tasks = get_news_tasks(
+        question_range,
+        kor_query,
+        kor_question_embedding,
+        eng_query,
+        eng_question_embedding,
     )
-    return related_reports
+    dedupe_index = SimHashIndex()
+    news_lists = run_parallel_with_progress(
+        "뉴스 검색 중...", [(search_news, (*x, None, dedupe_index)) for x in news_tasks]
+    )
+    related_news = [news for news_list in news_lists for news in news_list or []]
+    related_news = sorted(related_news, key=lambda x: x["similarity"], reverse=True)[:3]
+    return related_news
+
+
+def merge_related_news(related_news: List[dict], news_list: List[dict]) -> List[dict]:
+    merged_news = {}
+    for news in related_news + news_list:
+        if (
+            news["url"] not in merged_news
+            or merged_news[news["url"]]["similarity"] < news["similarity"]
+        ):
+            merged_news[news["url"]] = news
+    return sorted(merged_news.values(), key=lambda x: x["similarity"], reverse=True)[
+        :3
+    ]
+
+
+def race_related_news(
+    question_range: str,
+    kor_query_list: List[str],
+    kor_question_embedding: List[float],
+    eng_query_list: List[str],
+    eng_question_embedding: List[float],
+) -> List[dict]:
+    query_pairs = list(zip(kor_query_list, eng_query_list))
+    if not query_pairs:
+        return []
+    cancel_event = threading.Event()
+    executor = get_executor("question")
+    futures = {
+        executor.submit(
+            collect_related_news,
+            question_range,
+            kor_query,
+            kor_question_embedding,
+            eng_query,
+            eng_question_embedding,
+            cancel_event,
+        ): i
+        for i, (kor_query, eng_query) in enumerate(query_pairs)
+    }
+    related_news = []
+    try:
+        for future in concurrent.futures.as_completed(
+            futures, timeout=race_query_budget_seconds
+        ):
+            try:
+                news_list = future.result()
+            except Exception as e:
+                print("QUERY VARIANT FAILED", query_pairs[futures[future]], e)
+                continue
+            if not news_list:
+                continue
+            if race_query_mode == "first":
+                print("QUERY VARIANT WON", query_pairs[futures[future]])
+                related_news = news_list
+                break
+            related_news = merge_related_news(related_news, news_list)
+    except concurrent.futures.TimeoutError:
+        print("QUERY RACE BUDGET EXCEEDED", len(related_news))
+    finally:
+        # losing variants stop before their next crawl or embedding call
+        cancel_event.set()
+        for future in futures:
+            future.cancel()
+    return related_news
 
 
-def upload_related_news(related_news_list: List[dict]) -> List[dict]:
+def stream_related_news(
+    question_range: str,
+    kor_query: str,
+    kor_question_embedding: List[float],
+    eng_query: str,
+    eng_question_embedding: List[float],
+    placeholder,
+) -> List[dict]:
+    news_tasks = get_news_tasks(
+        question_range,
+        kor_query,
+        kor_question_embedding,
+        eng_query,
+        eng_question_embedding,
+    )
+    if not news_tasks:
+        return []
+    related_news = []
+    progress_bar = st.progress(0.0, text="뉴스 검색 중...")
+    # targets run on the search pool, only this thread draws
+    for news_item, finished in stream_search_news(news_tasks, SimHashIndex()):
+        if news_item is None:
+            progress_bar.progress(
+                finished / len(news_tasks),
+                text=f"뉴스 검색 중... ({finished}/{len(news_tasks)})",
+            )
+            continue
+        related_news = sorted(
+            related_news + [news_item],
+            key=lambda x: x["similarity"],
+            reverse=True,
+        )[:3]
+        with placeholder.container():
+            draw_news(related_news, expanded=False)
+    progress_bar.empty()
+    return related_news
+
+
+def link_related_news(related_news_list: List[dict]) -> List[dict]:
     updated_news_list = []
     for related_news in related_news_list:
         updated_news = deepcopy(related_news)
-        reference_page_html = get_reference_page_html(
-            origin_url=related_news["uploaded_news_url"],
-            reference_url=related_news["url"],
-            related_paragraph=related_news["related_paragraph"],
-        )
-        reference_page_url = upload_html(
-            related_news["uploaded_news_url"], reference_page_html
+        updated_news["reference_page_url"] = get_news_reference_page_link(
+            related_news["url"], related_news["index"]
         )
-        updated_news["reference_page_url"] = reference_page_url
         updated_news_list.append(updated_news)
     return updated_news_list
 
 
-def upload_related_reports(related_report_list: List[dict]) -> List[dict]:
+def link_related_reports(related_report_list: List[dict]) -> List[dict]:
     updated_report_list = []
     for related_report in related_report_list:
-        if "content" in related_report["metadata"]:
-            related_paragraph = related_report["metadata"]["content"]
-        else:
-            related_paragraph = related_report["metadata"]["kor_text"]
-        reference_page_html = get_reference_page_html(
-            origin_url=related_report["metadata"]["public_url"],
-            reference_url=None,
-            related_paragraph=related_paragraph,
-        )
-        reference_page_url = upload_html(
-            related_report["metadata"]["public_url"], reference_page_html
+        related_report["metadata"]["reference_page_url"] = get_report_reference_page_link(
+            related_report["metadata"]["namespace"], related_report["id"]
         )
-        related_report["metadata"]["reference_page_url"] = reference_page_url
         updated_report_list.append(related_report)
     return updated_report_list
 
@@ -221,19 +350,52 @@ if submit:
         eng_query_list = extract_query(eng_question)
         kor_query_list = translate(eng_query_list, kor_to_eng=False)
     related_news = []
-    for kor_query, eng_query in zip(kor_query_list, eng_query_list):
-        related_news = search_related_news(
-            question_range,
-            kor_query,
-            kor_question_embedding,
-            eng_query,
-            eng_question_embedding,
-        )
+    news_placeholder = st.empty()
+    news_search_start = time.perf_counter()
+    search_stats_before = get_search_stats()
+    if race_query_mode:
+        with st.spinner("뉴스 검색 중..."):
+            related_news = race_related_news(
+                question_range,
+                kor_query_list,
+                kor_question_embedding,
+                eng_query_list,
+                eng_question_embedding,
+            )
         if related_news:
-            related_news = upload_related_news(related_news)
-            break
+            related_news = link_related_news(related_news)
+    else:
+        for kor_query, eng_query in zip(kor_query_list, eng_query_list):
+            if stream_news:
+                related_news = stream_related_news(
+                    question_range,
+                    kor_query,
+                    kor_question_embedding,
+                    eng_query,
+                    eng_question_embedding,
+                    news_placeholder,
+                )
+            else:
+                related_news = search_related_news(
+                    question_range,
+                    kor_query,
+                    kor_question_embedding,
+                    eng_query,
+                    eng_question_embedding,
+                )
+            if related_news:
+                related_news = link_related_news(related_news)
+                break
+    # totals are process-wide, so questions running in other sessions at the same time blur this one's share
+    search_stats = get_search_stats()
+    print(
+        "NEWS SEARCH DONE",
+        f"{time.perf_counter() - news_search_start:.2f}s",
+        {key: value - search_stats_before[key] for key, value in search_stats.items()},
+    )
     if related_news:
-        draw_news(related_news, expanded=False)
+        with news_placeholder.container():
+            draw_news(related_news, expanded=False)
     prompt = generate_prompt(instruct, question, related_news)
     messages = [
         {"role": "system", "content": system_message},
@@ -261,16 +423,15 @@ if submit:
         f"question: {eng_question}  \nmain idea: {x}" for x in eng_main_ideas
     ]
     title_main_idea_embeddings = get_embedding(title_main_idea_list)
+    related_reports_list = search_all_related_reports(
+        question_range, title_main_idea_embeddings
+    )
     visited_report = set()
-    for i, (title_main_idea, title_main_idea_embedding) in enumerate(
-        zip(title_main_idea_list, title_main_idea_embeddings)
+    for i, (title_main_idea, related_reports) in enumerate(
+        zip(title_main_idea_list, related_reports_list)
     ):
-        related_reports = search_related_reports(
-            question_range, title_main_idea_embedding
-        )
-        related_reports = upload_related_reports(related_reports)
         selected_report = None
-        for related_report in related_reports:
+        for related_report in related_reports or []:
             report_id = related_report["id"].split("_")[0]
             if report_id in visited_report:
                 continue
@@ -279,6 +440,8 @@ if submit:
             break
         if not selected_report:
             continue
+        # only the report shown for this idea gets a reference page link
+        selected_report = link_related_reports(selected_report)
         draw_related_report(i + 1, selected_report, expanded=False)
         streaming_response = generate_advanced_analytics(
             title_main_idea, selected_report